@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import location, item, container, storage
+from . import location, item, container, storage, search
 
 
 warehouse_router = APIRouter(prefix="/warehouse")
@@ -8,3 +8,4 @@ warehouse_router.include_router(location.location_router)
 warehouse_router.include_router(storage.storage_router)
 warehouse_router.include_router(container.container_router)
 warehouse_router.include_router(item.item_router)
+warehouse_router.include_router(search.search_router)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from app.core.validate_code import validate_code
-from app.schemas.warehouse import NewContainer
-from app.models.warehouse import Storage, Container, PermissionRole, Location
+from app.schemas.warehouse import ContainerOut, NewContainer, ResolvedContainer
+from app.models.warehouse import Storage, Container, Location, Item
 from app.core.authorization import auth_required
+from app.core.caching import conditional_response, resource_etag
+from app.core.code_path import code_path_index
+from app.core.pagination import PageParams, paginate
+from app.core.permissions import EDIT_ROLES, VIEW_ROLES, require_role
+from app.core.responses import TimedJSONResponse
+from app.core.counters import count_container
 
 
 container_router = APIRouter()
@@ -14,19 +20,13 @@ async def create_container(payload: NewContainer, user: dict = Depends(auth_requ
     if not storage:
         raise HTTPException(status_code=404, detail="Storage not found")
 
-    location_code = (await Storage.find_one(Storage.code == storage.code)).location_code
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location_code,
-        PermissionRole.role == "admin" or PermissionRole.role == "editor",
+    await require_role(
+        user,
+        storage.location_code,
+        EDIT_ROLES,
+        "User doesn't have permission to create container in this storage",
     )
 
-    if not user_role:
-        raise HTTPException(
-            status_code=403,
-            detail="User doesn't have permission to create container in this storage",
-        )
-
     code = validate_code(payload.code)
     if code is None:
         raise HTTPException(status_code=400, detail="Invalid container code")
@@ -36,13 +36,62 @@ async def create_container(payload: NewContainer, user: dict = Depends(auth_requ
     ):
         raise HTTPException(status_code=400, detail="Container already exists")
 
-    container = await Container.create(Container(**payload.model_dump()))
+    container = await Container.create(
+        Container(**payload.model_dump(), location_code=storage.location_code)
+    )
+    code_path_index.invalidate(storage.location_code, storage.code, container.code)
+    await count_container(storage.location_code, storage.code)
 
     return container
 
 
-@container_router.get("/location/{location}/storage/{storage}/container/{code}")
-async def get_container(location, storage, code, user: dict = Depends(auth_required)):
+@container_router.get("/resolve/{path:path}", response_model=ResolvedContainer)
+async def resolve_code_path(
+    path: str, page: PageParams = Depends(), user: dict = Depends(auth_required)
+):
+    """Resolve a scanned LOCATION/STORAGE/CONTAINER label in one call."""
+    codes = [validate_code(code) for code in path.strip("/").split("/")]
+    if len(codes) != 3 or None in codes:
+        raise HTTPException(
+            status_code=400, detail="Path must be LOCATION/STORAGE/CONTAINER codes"
+        )
+    location, storage, code = codes
+
+    await require_role(
+        user,
+        location,
+        VIEW_ROLES,
+        "User does not have permission to view this container",
+    )
+
+    container = await code_path_index.resolve(location, storage, code)
+    if container is None:
+        raise HTTPException(status_code=404, detail="Container not found")
+
+    # Container codes repeat across storages, so items are matched on the
+    # full path. Items not yet backfilled with their location and storage
+    # (app.tasks.backfill_hierarchy) cannot be placed and are left out.
+    items, next_cursor = await paginate(
+        Item,
+        {"container_code": code, "storage_code": storage, "location_code": location},
+        page,
+    )
+    if page.includes("picture"):
+        for item in items:
+            item["has_picture"] = item.get("picture") is not None
+
+    return TimedJSONResponse(
+        {"container": container, "items": items, "next_cursor": next_cursor}
+    )
+
+
+@container_router.get(
+    "/location/{location}/storage/{storage}/container/{code}",
+    response_model=ContainerOut,
+)
+async def get_container(
+    location, storage, code, request: Request, user: dict = Depends(auth_required)
+):
     location = await Location.find_one(Location.code == location)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
@@ -59,16 +108,15 @@ async def get_container(location, storage, code, user: dict = Depends(auth_requi
     if not container:
         raise HTTPException(status_code=404, detail="Container not found")
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location.code,
+    await require_role(
+        user,
+        location.code,
+        VIEW_ROLES,
+        "User does not have permission to view this container",
     )
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
-        raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to view this container",
-        )
 
-    container = container.model_dump()
+    async def build():
+        return container.model_dump()
 
-    return container
+    etag = resource_etag(request, "container", container.id, container.version)
+    return await conditional_response(request, etag, build)
@@ -1,8 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
-from fastapi.responses import FileResponse
-from app.schemas.warehouse import NewItem
-from app.models.warehouse import Storage, Container, PermissionRole, Location, Item
+import asyncio
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    File,
+    Request,
+    UploadFile,
+)
+from starlette.concurrency import run_in_threadpool
+from beanie import PydanticObjectId
+from bson import ObjectId
+from datetime import datetime
+from pymongo.errors import BulkWriteError
+from typing import List
+from app.schemas.warehouse import (
+    ItemBatch,
+    ItemIds,
+    ItemOut,
+    ItemPage,
+    NewItem,
+    PictureSize,
+    StockAdjustment,
+    StockAdjustments,
+)
+from app.models.warehouse import Storage, Container, Location, Item
 from app.core.authorization import auth_required
+from app.core.pagination import PageParams, paginate
+from app.core.config import settings
+from app.core.counters import count_items
+from app.core.hierarchy import resolve_container, resolve_containers, resolve_item
+from app.core.permissions import (
+    EDIT_ROLES,
+    VIEW_ROLES,
+    permission_cache,
+    require_role,
+)
+from app.core.pictures import picture_path, picture_response, save_picture
+from app.core.responses import TimedJSONResponse
+from app.core.stock import adjust_stock
+from app.core.thumbnails import thumbnail_pool, variant_path
 from os import path as os_path
 
 
@@ -14,133 +51,306 @@ async def create_item(
     payload: NewItem,
     user: dict = Depends(auth_required),
 ):
-    container = await Container.find_one(Container.code == payload.container_code)
-    if not container:
-        raise HTTPException(status_code=404, detail="Container not found")
-
-    location_code = (
-        await Storage.find_one(Storage.code == container.storage_code)
-    ).location_code
-
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location_code,
-        PermissionRole.role == "admin" or PermissionRole.role == "editor",
-    )
-
-    if not user_role:
+    container = await resolve_container(payload.container_code, user)
+    if container.role not in EDIT_ROLES:
         raise HTTPException(
             status_code=403,
             detail="User does not have permission to create an item in this container",
         )
 
-    item = await Item.create(Item(**payload.model_dump()))
+    item = await Item.create(
+        Item(
+            **payload.model_dump(),
+            storage_code=container.storage_code,
+            location_code=container.location_code,
+        )
+    )
+    await count_items([container])
     return item
 
 
-@item_router.get("/item/{itemid}")
-async def get_item(itemid, user: dict = Depends(auth_required)):
-    item = await Item.get(itemid)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
+@item_router.post("/item/bulk")
+async def create_items(
+    payload: List[NewItem],
+    user: dict = Depends(auth_required),
+):
+    if len(payload) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items can be created at once",
+        )
 
-    container = await Container.find_one(Container.code == item.container_code)
-    if not container:
-        raise HTTPException(status_code=404, detail="Container not found")
+    containers = await resolve_containers(
+        [new_item.container_code for new_item in payload], user
+    )
+
+    errors = []
+    rows = []
+    # insert_many skips the Insert event, so stamp the rows here.
+    now = datetime.utcnow()
+    for index, new_item in enumerate(payload):
+        container = containers.get(new_item.container_code)
+        if container is None:
+            errors.append(
+                {"index": index, "status_code": 404, "detail": "Container not found"}
+            )
+            continue
+        if container.role not in EDIT_ROLES:
+            errors.append(
+                {
+                    "index": index,
+                    "status_code": 403,
+                    "detail": "User does not have permission to create an item "
+                    "in this container",
+                }
+            )
+            continue
+        item = Item(
+            **new_item.model_dump(),
+            storage_code=container.storage_code,
+            location_code=container.location_code,
+            created_at=now,
+            updated_at=now,
+        )
+        item.id = PydanticObjectId()
+        rows.append((index, item))
+
+    failed = set()
+    if rows:
+        try:
+            await Item.insert_many([item for _, item in rows], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                index = rows[error["index"]][0]
+                failed.add(index)
+                errors.append(
+                    {"index": index, "status_code": 400, "detail": error["errmsg"]}
+                )
+
+    created = [
+        {"index": index, "item": item.model_dump()}
+        for index, item in rows
+        if index not in failed
+    ]
+    await count_items(
+        containers[payload[entry["index"]].container_code] for entry in created
+    )
+    errors.sort(key=lambda error: error["index"])
+
+    return {"created": created, "errors": errors}
 
-    location_code = (
-        await Storage.find_one(Storage.code == container.storage_code)
-    ).location_code
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location_code,
+@item_router.post("/item/batch", response_model=ItemBatch)
+async def get_items_batch(payload: ItemIds, user: dict = Depends(auth_required)):
+    if len(payload.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_IDS} items can be fetched at once",
+        )
+
+    errors = {}
+    object_ids = []
+    for item_id in dict.fromkeys(payload.ids):
+        if ObjectId.is_valid(item_id):
+            object_ids.append(ObjectId(item_id))
+        else:
+            errors[item_id] = {"status_code": 404, "detail": "Item not found"}
+
+    items = await (
+        Item.get_motor_collection()
+        .find({"_id": {"$in": object_ids}})
+        .to_list(len(object_ids))
     )
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
+
+    # Items that predate the denormalized codes are resolved in bulk.
+    containers = await resolve_containers(
+        {item["container_code"] for item in items if not item.get("location_code")},
+        user,
+    )
+    roles = await permission_cache.roles(user["sub"])
+
+    found = {}
+    for item in items:
+        item_id = str(item.pop("_id"))
+        location_code = item.get("location_code")
+        if not location_code:
+            container = containers.get(item["container_code"])
+            if container is None:
+                errors[item_id] = {"status_code": 404, "detail": "Container not found"}
+                continue
+            location_code = container.location_code
+        if roles.get(location_code) not in VIEW_ROLES:
+            errors[item_id] = {
+                "status_code": 403,
+                "detail": "User does not have permission to view this item",
+            }
+            continue
+        item["id"] = item_id
+        item["has_picture"] = item.get("picture") is not None
+        found[item_id] = item
+
+    for item_id in object_ids:
+        if str(item_id) not in found and str(item_id) not in errors:
+            errors[str(item_id)] = {"status_code": 404, "detail": "Item not found"}
+
+    return TimedJSONResponse({"items": found, "errors": errors})
+
+
+@item_router.post("/item/stock")
+async def adjust_items_stock(
+    payload: StockAdjustments, user: dict = Depends(auth_required)
+):
+    """Apply many stock adjustments; each row succeeds or fails on its own."""
+    if len(payload.adjustments) > settings.BULK_MAX_ITEMS:
         raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to view this item",
+            status_code=400,
+            detail=f"At most {settings.BULK_MAX_ITEMS} items can be adjusted at once",
         )
 
-    item = item.model_dump()
+    object_ids = {
+        row.id: ObjectId(row.id)
+        for row in payload.adjustments
+        if ObjectId.is_valid(row.id)
+    }
+    items = await (
+        Item.get_motor_collection()
+        .find(
+            {"_id": {"$in": list(object_ids.values())}},
+            {"container_code": 1, "location_code": 1},
+        )
+        .to_list(len(object_ids))
+    )
+    # Items that predate the denormalized codes are resolved in bulk.
+    containers = await resolve_containers(
+        {item["container_code"] for item in items if not item.get("location_code")},
+        user,
+    )
+    locations = {}
+    for item in items:
+        location_code = item.get("location_code")
+        if not location_code and item["container_code"] in containers:
+            location_code = containers[item["container_code"]].location_code
+        locations[str(item["_id"])] = location_code
+    roles = await permission_cache.roles(user["sub"])
+
+    async def adjust(index, row):
+        if row.id not in locations:
+            return {"index": index, "status_code": 404, "detail": "Item not found"}
+        if roles.get(locations[row.id]) not in EDIT_ROLES:
+            return {
+                "index": index,
+                "status_code": 403,
+                "detail": "User does not have permission to adjust this item",
+            }
+        try:
+            quantity = await adjust_stock(object_ids[row.id], row.delta)
+        except HTTPException as e:
+            return {"index": index, "status_code": e.status_code, "detail": e.detail}
+        return {"index": index, "id": row.id, "quantity": quantity}
+
+    results = await asyncio.gather(
+        *[adjust(index, row) for index, row in enumerate(payload.adjustments)]
+    )
+    return {
+        "adjusted": [result for result in results if "quantity" in result],
+        "errors": [result for result in results if "status_code" in result],
+    }
 
-    if os_path.isfile(f"static/{item['id']}.jpg"):
-        item["has_picture"] = True
-    else:
-        item["has_picture"] = False
 
-    return item
+@item_router.post("/item/{itemid}/stock")
+async def adjust_item_stock(
+    itemid, payload: StockAdjustment, user: dict = Depends(auth_required)
+):
+    resolved = await resolve_item(itemid, user)
+    if resolved.role not in EDIT_ROLES:
+        raise HTTPException(
+            status_code=403,
+            detail="User does not have permission to adjust this item",
+        )
 
+    quantity = await adjust_stock(resolved.item.id, payload.delta)
+    return {"id": str(resolved.item.id), "quantity": quantity}
 
-@item_router.get("/item/{itemid}/picture")
-async def get_item_picture(itemid, user: dict = Depends(auth_required)):
-    item = await Item.get(itemid)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
 
-    container = await Container.find_one(Container.code == item.container_code)
-    if not container:
-        raise HTTPException(status_code=404, detail="Container not found")
+@item_router.get("/item/{itemid}", response_model=ItemOut)
+async def get_item(itemid, user: dict = Depends(auth_required)):
+    resolved = await resolve_item(itemid, user)
+    if resolved.role not in VIEW_ROLES:
+        raise HTTPException(
+            status_code=403,
+            detail="User does not have permission to view this item",
+        )
 
-    location_code = (
-        await Storage.find_one(Storage.code == container.storage_code)
-    ).location_code
+    item = resolved.item.model_dump()
+    item["has_picture"] = item["picture"] is not None
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location_code,
-    )
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
+    return TimedJSONResponse(item)
+
+
+@item_router.get("/item/{itemid}/picture")
+async def get_item_picture(
+    itemid,
+    request: Request,
+    size: PictureSize = PictureSize.original,
+    user: dict = Depends(auth_required),
+):
+    resolved = await resolve_item(itemid, user)
+    if resolved.role not in VIEW_ROLES:
         raise HTTPException(
             status_code=403,
             detail="User does not have permission to view this item",
         )
+    item = resolved.item
 
-    if os_path.isfile(f"static/{item.id}.jpg"):
-        return FileResponse(f"static/{item.id}.jpg")
-    else:
+    if item.picture is None:
         raise HTTPException(status_code=404, detail="Picture not found")
 
+    file_path = variant_path(item.id, size.value)
+    if size != PictureSize.original and not await run_in_threadpool(
+        os_path.isfile, file_path
+    ):
+        try:
+            await thumbnail_pool.generate(item.id, [size.value])
+        except OSError:
+            raise HTTPException(status_code=415, detail="Picture cannot be resized")
+
+    variant = "" if size == PictureSize.original else f"-{size.value}"
+    return await picture_response(request, file_path, item.picture, variant)
+
 
 @item_router.patch("/item/{itemid}/picture")
 async def set_item_picture(
-    itemid, picture: UploadFile = File(None), user: dict = Depends(auth_required)
+    itemid,
+    background_tasks: BackgroundTasks,
+    picture: UploadFile = File(None),
+    user: dict = Depends(auth_required),
 ):
-    item = await Item.get(itemid)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    container = await Container.find_one(Container.code == item.container_code)
-    if not container:
-        raise HTTPException(status_code=404, detail="Container not found")
-
-    location_code = (
-        await Storage.find_one(Storage.code == container.storage_code)
-    ).location_code
-
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location_code,
-        PermissionRole.role == "admin" or PermissionRole.role == "editor",
-    )
-    if not user_role:
+    resolved = await resolve_item(itemid, user)
+    if resolved.role not in EDIT_ROLES:
         raise HTTPException(
             status_code=403,
             detail="User does not have permission to set the picture of this item",
         )
+    item = resolved.item
 
     if picture:
-        with open(f"static/{item.id}.jpg", "wb") as buffer:
-            buffer.write(await picture.read())
+        await thumbnail_pool.invalidate(item.id)
+        info = await save_picture(picture, picture_path(item.id))
+        await item.set({Item.picture: info, Item.updated_at: datetime.utcnow()})
+        background_tasks.add_task(thumbnail_pool.pregenerate, item.id)
 
     return {"message": "Picture set successfully"}
 
 
-@item_router.get("/location/{location}/storage/{storage}/container/{code}/items")
+@item_router.get(
+    "/location/{location}/storage/{storage}/container/{code}/items",
+    response_model=ItemPage,
+)
 async def get_items(
     location,
     storage,
     code,
+    page: PageParams = Depends(),
     user: dict = Depends(auth_required),
 ):
     location = await Location.find_one(Location.code == location)
@@ -159,24 +369,26 @@ async def get_items(
     if not container:
         raise HTTPException(status_code=404, detail="Container not found")
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location.code,
+    await require_role(
+        user,
+        location.code,
+        VIEW_ROLES,
+        "User does not have permission to view this container",
     )
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
-        raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to view this container",
-        )
 
-    items = []
+    # Container codes repeat across storages; see resolve_code_path.
+    items, next_cursor = await paginate(
+        Item,
+        {
+            "container_code": container.code,
+            "storage_code": storage.code,
+            "location_code": location.code,
+        },
+        page,
+    )
 
-    async for item in Item.find(Item.container_code == container.code):
-        item = item.model_dump()
-        if os_path.isfile(f"static/{item['id']}.jpg"):
-            item["has_picture"] = True
-        else:
-            item["has_picture"] = False
-        items.append(item)
+    if page.includes("picture"):
+        for item in items:
+            item["has_picture"] = item.get("picture") is not None
 
-    return items
+    return TimedJSONResponse({"items": items, "next_cursor": next_cursor})
@@ -1,8 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pymongo.errors import DuplicateKeyError
 from app.core.validate_code import validate_code
-from app.schemas.warehouse import NewLocation
-from app.models.warehouse import Location, Storage, Container, Item, PermissionRole
+from app.schemas.warehouse import LocationOut, NewLocation
+from app.models.warehouse import Container, Location, Storage
 from app.core.authorization import auth_required
+from app.core.caching import conditional_response, resource_etag
+from app.core.change_feed import CLOSED, OVERFLOW, change_feed
+from app.core.config import settings
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    PageParams,
+    paginate,
+)
+from app.core.code_path import code_path_index
+from app.core.export import export_ndjson, export_tree
+from app.core.importer import (
+    ImportFailed,
+    LocationImporter,
+    prepare_location,
+    spool_records,
+    spool_stream,
+    validate_spool,
+)
+from app.core.permissions import (
+    VIEW_ROLES,
+    grant_role,
+    permission_cache,
+    require_role,
+)
+from app.core.responses import TimedJSONResponse, json_dumps
+from app.core.sync import changes_since, decode_watermark
 
 
 location_router = APIRouter()
@@ -17,87 +50,206 @@ async def create_location(payload: NewLocation, user: dict = Depends(auth_requir
     if await Location.find_one(Location.code == code):
         raise HTTPException(status_code=400, detail="Location already exists")
 
-    location = await Location.create(Location(**payload.model_dump()))
+    try:
+        location = await Location.create(Location(**payload.model_dump()))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Location already exists")
 
-    await PermissionRole.create(
-        PermissionRole(user_id=user["sub"], location_code=location.code, role="admin")
-    )
+    await grant_role(user["sub"], location.code, "admin")
+    code_path_index.invalidate(location.code)
 
     return location
 
 
-@location_router.get("/location/{code}")
-async def get_location(code, user: dict = Depends(auth_required)):
+@location_router.post("/location/import")
+async def import_location(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=10000),
+    resume_from: int = Query(0, ge=0),
+    user: dict = Depends(auth_required),
+):
+    spool = await spool_stream(request.stream())
+    try:
+        validator = await run_in_threadpool(validate_spool, spool)
+        admin_user_id = await prepare_location(validator.location_code, user["sub"])
+    except ImportFailed as e:
+        spool.close()
+        raise HTTPException(status_code=400, detail=e.errors)
+
+    importer = LocationImporter(
+        batch_size=batch_size, resume_from=resume_from, admin_user_id=admin_user_id
+    )
+
+    async def progress():
+        try:
+            async for imported in importer.run(spool_records(spool)):
+                yield json.dumps({"imported": imported, "total": validator.total})
+                yield "\n"
+            yield json.dumps({"done": True, "imported": importer.position}) + "\n"
+            code_path_index.invalidate(validator.location_code)
+        except ImportFailed as e:
+            yield json.dumps({"errors": e.errors, "resume_from": e.resume_from})
+            yield "\n"
+        finally:
+            spool.close()
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
+
+@location_router.get("/location/{code}", response_model=LocationOut)
+async def get_location(
+    code,
+    request: Request,
+    page: PageParams = Depends(),
+    user: dict = Depends(auth_required),
+):
     location = await Location.find_one(Location.code == code)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location.code,
+    await require_role(
+        user,
+        location.code,
+        VIEW_ROLES,
+        "User does not have permission to view this location",
     )
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
+
+    async def build():
+        storages, next_cursor = await paginate(
+            Storage, {"location_code": code}, page, exclude=["location_code"]
+        )
+        for storage in storages:
+            to_delete = [
+                "id",
+                "location_code",
+            ]
+            for key in to_delete:
+                storage.pop(key, None)
+
+        body = location.model_dump()
+        body["storages"] = storages
+        body["next_cursor"] = next_cursor
+        return body
+
+    etag = resource_etag(request, "location", location.id, location.version)
+    return await conditional_response(request, etag, build)
+
+
+@location_router.get("/location/{code}/changes")
+async def get_location_changes(
+    code,
+    since: Optional[str] = Query(
+        None, description="Watermark returned by the previous call"
+    ),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: dict = Depends(auth_required),
+):
+    watermark = decode_watermark(since)
+    location = await Location.find_one(Location.code == code)
+    if not location:
+        raise HTTPException(status_code=404, detail="Location not found")
+
+    await require_role(
+        user,
+        location.code,
+        VIEW_ROLES,
+        "User does not have permission to view this location",
+    )
+
+    return TimedJSONResponse(await changes_since(location.code, watermark, limit))
+
+
+@location_router.get("/location/{code}/events")
+async def location_events(
+    code,
+    storage: Optional[str] = Query(None, description="Storage of the container"),
+    container: Optional[str] = Query(None, description="Only this container"),
+    user: dict = Depends(auth_required),
+):
+    """Server-Sent Events stream of writes to a location or one container."""
+    if container is not None and storage is None:
         raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to view this location",
+            status_code=400, detail="storage is required to follow a container"
         )
+    if not change_feed.running:
+        raise HTTPException(status_code=503, detail="Change feed is disabled")
 
-    storages = []
+    location = await Location.find_one(Location.code == code)
+    if not location:
+        raise HTTPException(status_code=404, detail="Location not found")
 
-    async for storage in Storage.find(Storage.location_code == code):
-        storage = storage.model_dump()
-        to_delete = [
-            "id",
-            "location_code",
-        ]
-        for key in to_delete:
-            del storage[key]
-        storages.append(storage)
+    await require_role(
+        user,
+        location.code,
+        VIEW_ROLES,
+        "User does not have permission to view this location",
+    )
 
-    location = location.model_dump()
-    location["storages"] = storages
+    if container is not None and not await Container.find_one(
+        Container.code == container,
+        Container.storage_code == storage,
+        Container.location_code == location.code,
+    ):
+        raise HTTPException(status_code=404, detail="Container not found")
 
-    return location
+    subscription = change_feed.subscribe(
+        user["sub"], location.code, None if container is None else (storage, container)
+    )
+
+    async def events():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), settings.CHANGE_FEED_HEARTBEAT
+                    )
+                except asyncio.TimeoutError:
+                    event = None
+
+                if event in (OVERFLOW, CLOSED):
+                    yield f"event: {event}\ndata: {{}}\n\n"
+                    return
+                # Roles come from the cache, so a revoked role ends the
+                # stream within PERMISSION_CACHE_TTL.
+                roles = await permission_cache.roles(user["sub"])
+                if roles.get(location.code) not in VIEW_ROLES:
+                    yield "event: forbidden\ndata: {}\n\n"
+                    return
+
+                if event is None:
+                    yield ": heartbeat\n\n"
+                else:
+                    yield b"event: change\ndata: " + json_dumps(event) + b"\n\n"
+        finally:
+            change_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @location_router.get("/location/{code}/export")
-async def export_location(code, user: dict = Depends(auth_required)):
-    location = await Location.find_one(Location.code == code)
+async def export_location(
+    code,
+    export_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    user: dict = Depends(auth_required),
+):
+    location = await Location.get_motor_collection().find_one({"code": code})
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location.code,
+    await require_role(
+        user,
+        location["code"],
+        VIEW_ROLES,
+        "User does not have permission to export this location",
     )
 
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
-        raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to export this location",
+    if export_format == "ndjson":
+        return StreamingResponse(
+            export_ndjson(location), media_type="application/x-ndjson"
         )
-    loc_exp = {
-        "location": await Location.find_one(Location.code == code),
-        "storages": [
-            {
-                "storage": storage,
-                "containers": [
-                    {
-                        "container": container,
-                        "items": [
-                            item
-                            async for item in Item.find(
-                                Item.container_code == container.code
-                            )
-                        ],
-                    }
-                    async for container in Container.find(
-                        Container.storage_code == storage.code
-                    )
-                ],
-            }
-            async for storage in Storage.find(Storage.location_code == code)
-        ],
-    }
 
-    return loc_exp
+    return await export_tree(location)
@@ -0,0 +1,98 @@
+import re
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.authorization import auth_required
+from app.core.permissions import VIEW_ROLES, permission_cache
+from app.core.responses import TimedJSONResponse
+from app.models.warehouse import Storage, Container, Item
+
+
+search_router = APIRouter()
+
+SEARCH_MODELS = {
+    "storage": Storage,
+    "container": Container,
+    "item": Item,
+}
+MAX_SEARCH_OFFSET = 1000
+PROJECTION = {
+    "name": 1,
+    "description": 1,
+    "code": 1,
+    "location_code": 1,
+    "storage_code": 1,
+    "container_code": 1,
+    "name_key": 1,
+}
+
+
+async def _search_collection(kind, query, sort, projection, limit):
+    results = []
+    cursor = (
+        SEARCH_MODELS[kind]
+        .get_motor_collection()
+        .find(query, projection)
+        .sort(sort)
+        .limit(limit)
+    )
+    async for document in cursor:
+        document["id"] = str(document.pop("_id"))
+        document["type"] = kind
+        results.append(document)
+    return results
+
+
+@search_router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    mode: str = Query("text", pattern="^(text|prefix)$"),
+    types: str = Query("item,container,storage"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    user: dict = Depends(auth_required),
+):
+    kinds = [kind.strip() for kind in types.split(",") if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in SEARCH_MODELS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown types: {', '.join(unknown)}"
+        )
+
+    roles = await permission_cache.roles(user["sub"])
+    locations = [code for code, role in roles.items() if role in VIEW_ROLES]
+    if not locations:
+        return {"results": [], "next_offset": None}
+
+    # Each collection returns its best offset + limit + 1 hits; the merged
+    # list is then paged, and the extra hit tells whether there is more.
+    fetch = offset + limit + 1
+    if mode == "prefix":
+        query = {
+            "location_code": {"$in": locations},
+            "name_key": {"$regex": "^" + re.escape(q.lower())},
+        }
+        sort = [("name_key", 1)]
+        projection = PROJECTION
+    else:
+        query = {"$text": {"$search": q}, "location_code": {"$in": locations}}
+        sort = [("score", {"$meta": "textScore"})]
+        projection = {**PROJECTION, "score": {"$meta": "textScore"}}
+
+    hits = await asyncio.gather(
+        *[
+            _search_collection(kind, query, sort, projection, fetch)
+            for kind in kinds
+        ]
+    )
+    results = [hit for collection_hits in hits for hit in collection_hits]
+    if mode == "prefix":
+        results.sort(key=lambda hit: hit["name_key"])
+    else:
+        results.sort(key=lambda hit: hit["score"], reverse=True)
+
+    page = results[offset : offset + limit]
+    for hit in page:
+        hit.pop("name_key", None)
+    next_offset = offset + limit if len(results) > offset + limit else None
+
+    return TimedJSONResponse({"results": page, "next_offset": next_offset})
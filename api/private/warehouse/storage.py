@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pymongo.errors import DuplicateKeyError
 from app.core.authorization import auth_required
+from app.core.caching import conditional_response, resource_etag
+from app.core.code_path import code_path_index
+from app.core.pagination import PageParams, paginate
+from app.core.permissions import ADMIN_ROLES, VIEW_ROLES, require_role
 from app.core.validate_code import validate_code
-from app.models.warehouse import Storage, Location, PermissionRole, Container
-from app.schemas.warehouse import NewStorage
+from app.core.counters import count_storage
+from app.models.warehouse import Storage, Location, Container
+from app.schemas.warehouse import NewStorage, StorageOut
 
 
 storage_router = APIRouter()
@@ -14,16 +20,12 @@ async def create_storage(payload: NewStorage, user: dict = Depends(auth_required
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location.code,
-        PermissionRole.role == "admin",
+    await require_role(
+        user,
+        location.code,
+        ADMIN_ROLES,
+        "User does not have permission to create storage in this location",
     )
-    if not user_role:
-        raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to create storage in this location",
-        )
 
     code = validate_code(payload.code)
     if code is None:
@@ -34,13 +36,24 @@ async def create_storage(payload: NewStorage, user: dict = Depends(auth_required
     ):
         raise HTTPException(status_code=400, detail="Storage already exists")
 
-    storage = await Storage.create(Storage(**payload.model_dump()))
+    try:
+        storage = await Storage.create(Storage(**payload.model_dump()))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Storage already exists")
+    code_path_index.invalidate(storage.location_code, storage.code)
+    await count_storage(location.code)
 
     return storage
 
 
-@storage_router.get("/location/{location}/storage/{code}")
-async def get_storage(location, code, user: dict = Depends(auth_required)):
+@storage_router.get("/location/{location}/storage/{code}", response_model=StorageOut)
+async def get_storage(
+    location,
+    code,
+    request: Request,
+    page: PageParams = Depends(),
+    user: dict = Depends(auth_required),
+):
     storage = await Storage.find_one(Storage.code == code)
     if not storage:
         raise HTTPException(status_code=404, detail="Storage not found")
@@ -49,29 +62,29 @@ async def get_storage(location, code, user: dict = Depends(auth_required)):
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    user_role = await PermissionRole.find_one(
-        PermissionRole.user_id == user["sub"],
-        PermissionRole.location_code == location.code,
+    await require_role(
+        user,
+        location.code,
+        VIEW_ROLES,
+        "User does not have permission to view this storage",
     )
-    if not user_role or user_role.role not in ["admin", "editor", "viewer"]:
-        raise HTTPException(
-            status_code=403,
-            detail="User does not have permission to view this storage",
-        )
-
-    containers = []
 
-    async for container in Container.find(Container.storage_code == code):
-        container = container.model_dump()
-        to_delete = [
-            "id",
-            "storage_code",
-        ]
-        for key in to_delete:
-            del container[key]
-        containers.append(container)
-
-    storage = storage.model_dump()
-    storage["containers"] = containers
-
-    return storage
+    async def build():
+        containers, next_cursor = await paginate(
+            Container, {"storage_code": code}, page, exclude=["storage_code"]
+        )
+        for container in containers:
+            to_delete = [
+                "id",
+                "storage_code",
+            ]
+            for key in to_delete:
+                container.pop(key, None)
+
+        body = storage.model_dump()
+        body["containers"] = containers
+        body["next_cursor"] = next_cursor
+        return body
+
+    etag = resource_etag(request, "storage", storage.id, storage.version)
+    return await conditional_response(request, etag, build)
@@ -1,7 +1,21 @@
+import httpx
 from fastapi import HTTPException, Header, Request
+from app.core.config import settings
+from app.core.jwks_validator import ZitadelJWTTokenValidator
+from app.core.metrics import timed
 from app.core.validator import ValidatorError, ZitadelIntrospectTokenValidator
 
 
+_validators = {
+    "introspection": ZitadelIntrospectTokenValidator(),
+    "jwt": ZitadelJWTTokenValidator(),
+}
+
+
+def get_token_validator():
+    return _validators[settings.TOKEN_VALIDATION_MODE]
+
+
 async def auth_required(req: Request, authorization: str = Header(None)):
     """Check if the user is authorized."""
     if authorization is None:
@@ -11,12 +25,23 @@ async def auth_required(req: Request, authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Unauthorized")
     token = token[1]
 
-    validator = ZitadelIntrospectTokenValidator()
+    validator = get_token_validator()
     validator.validate_request(req)
-    _token = validator.authenticate_token(token)
 
     try:
-        validator.validate_token(_token, _token.get("scope"), req)
+        with timed("auth_time"):
+            _token = await validator.authenticate_token_async(token)
+            validator.validate_token(_token, _token.get("scope"), req)
         return _token
+    except httpx.HTTPStatusError as e:
+        # A 4xx means Zitadel rejected our own request (client assertion,
+        # JWKS URL); retrying will not help, so report it as a bad gateway.
+        if e.response.status_code < 500:
+            raise HTTPException(
+                status_code=502, detail="Identity provider rejected the request"
+            )
+        raise HTTPException(status_code=503, detail="Identity provider unavailable")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=503, detail="Identity provider unavailable")
     except ValidatorError as e:
         raise HTTPException(status_code=e.status_code, detail=e.error)
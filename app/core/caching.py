@@ -0,0 +1,113 @@
+import calendar
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import Request
+from fastapi.responses import Response
+from app.core.config import settings
+from app.core.responses import TimedJSONResponse
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP date."""
+    return formatdate(calendar.timegm(value.utctimetuple()), usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[datetime]:
+    """Parse an HTTP date into a naive UTC datetime."""
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match style header with an ETag."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return etag.removeprefix("W/") in [c.removeprefix("W/") for c in candidates]
+
+
+def strong_etag_matches(header: Optional[str], etag: str) -> bool:
+    """Strong comparison of an If-Range header with an ETag (RFC 9110 8.8.3.2).
+
+    Weak validators never match, so a W/ tag or an HTTP date in If-Range
+    falls back to the full representation.
+    """
+    if not header or etag.startswith("W/"):
+        return False
+    return header.strip() == etag
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """Whether a conditional GET can be answered with 304 Not Modified."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        since = parse_http_date(if_modified_since)
+        return since is not None and last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def resource_etag(request: Request, kind: str, resource_id, version: int) -> str:
+    """Strong ETag for a versioned resource and the query that rendered it."""
+    query = hashlib.sha1(request.url.query.encode()).hexdigest()[:12]
+    return f'"{kind}-{resource_id}-{version}-{query}"'
+
+
+class ResponseCache:
+    """Rendered response bodies keyed by ETag, in a bounded LRU.
+
+    ETags embed the resource version, so entries never go stale; old
+    versions simply fall out of the LRU.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[bytes]:
+        body = self._entries.get(etag)
+        if body is not None:
+            self._entries.move_to_end(etag)
+        return body
+
+    def set(self, etag: str, body: bytes):
+        if self.max_size <= 0:
+            return
+        self._entries[etag] = body
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE)
+
+
+async def conditional_response(
+    request: Request, etag: str, build: Callable[[], Awaitable[Any]]
+) -> Response:
+    """Answer with 304 when the client's copy is current, else with the
+    cached or freshly built body. build is only awaited on a cache miss."""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+    if body is None:
+        body = TimedJSONResponse(await build()).body
+        response_cache.set(etag, body)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,183 @@
+"""Push notifications of inventory writes, from one change stream per worker.
+
+ChangeFeed watches the locations, storages, containers and items
+collections and fans every insert/update out to the subscriptions whose
+location (and optionally container, identified by storage and container
+code) it touches. Each subscription has a
+bounded queue; a subscriber that falls behind is dropped with an overflow
+marker rather than slowing down the feed or the other subscribers, and is
+expected to catch up through the /changes delta feed.
+
+Needs MongoDB running as a replica set; enable with CHANGE_FEED. Streams
+are ended with a CLOSED marker on the server's exit signal (see
+app.core.shutdown); run uvicorn with --timeout-graceful-shutdown as well so
+a stuck client cannot hold up shutdown.
+"""
+import asyncio
+import contextlib
+import logging
+from typing import Optional, Set, Tuple
+from app.core.config import settings
+from app.models.warehouse import Container, Item, Location, Storage
+
+
+logger = logging.getLogger(__name__)
+
+# Collection name -> (event type, field holding the location code)
+WATCHED = {
+    Location.Settings.name: ("location", "code"),
+    Storage.Settings.name: ("storage", "location_code"),
+    Container.Settings.name: ("container", "location_code"),
+    Item.Settings.name: ("item", "location_code"),
+}
+OVERFLOW = "overflow"
+CLOSED = "closed"
+
+
+class Subscription:
+    def __init__(
+        self,
+        user_id: str,
+        location_code: str,
+        container: Optional[Tuple[str, str]],
+        queue_size: int,
+    ):
+        self.user_id = user_id
+        self.location_code = location_code
+        # (storage_code, code); container codes repeat across storages.
+        self.container = container
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+
+    def matches(self, event: dict) -> bool:
+        if event["location_code"] != self.location_code:
+            return False
+        if self.container is None:
+            return True
+        document = event["document"]
+        if event["type"] == "item":
+            code_field = "container_code"
+        elif event["type"] == "container":
+            code_field = "code"
+        else:
+            return False
+        storage_code, code = self.container
+        return (
+            document.get("storage_code") == storage_code
+            and document.get(code_field) == code
+        )
+
+    def end(self, reason: str):
+        """Replace whatever is queued with a final marker."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(reason)
+
+
+class ChangeFeed:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._watch())
+
+    def stop(self):
+        """End every subscription with a CLOSED marker and refuse new ones.
+
+        Runs as soon as the server receives its exit signal: open event
+        streams would otherwise keep the server waiting for them to finish
+        before the lifespan shutdown (and close) is ever reached.
+        """
+        self._stopping = True
+        for subscription in self._subscriptions:
+            subscription.end(CLOSED)
+        self._subscriptions.clear()
+
+    async def close(self):
+        self.stop()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def subscribe(
+        self,
+        user_id: str,
+        location_code: str,
+        container: Optional[Tuple[str, str]] = None,
+    ) -> Subscription:
+        subscription = Subscription(user_id, location_code, container, self.queue_size)
+        if self._stopping:
+            subscription.end(CLOSED)
+        else:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: dict):
+        for subscription in list(self._subscriptions):
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.unsubscribe(subscription)
+                subscription.end(OVERFLOW)
+
+    async def _watch(self):
+        database = Item.get_motor_collection().database
+        pipeline = [
+            {
+                "$match": {
+                    "ns.coll": {"$in": list(WATCHED)},
+                    "operationType": {"$in": ["insert", "update", "replace"]},
+                }
+            }
+        ]
+        resume_after = None
+        while True:
+            try:
+                async with database.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_after
+                ) as stream:
+                    async for change in stream:
+                        resume_after = stream.resume_token
+                        event = self._event(change)
+                        if event is not None:
+                            self.publish(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Change feed stream failed, restarting")
+                await asyncio.sleep(5)
+
+    @staticmethod
+    def _event(change: dict) -> Optional[dict]:
+        document = change.get("fullDocument")
+        if document is None:
+            # Deleted before the update could be looked up.
+            return None
+        kind, location_field = WATCHED[change["ns"]["coll"]]
+        location_code = document.get(location_field)
+        if location_code is None:
+            return None
+        document["id"] = str(document.pop("_id"))
+        return {
+            "op": change["operationType"],
+            "type": kind,
+            "location_code": location_code,
+            "document": document,
+        }
+
+
+change_feed = ChangeFeed(settings.CHANGE_FEED_QUEUE_SIZE)
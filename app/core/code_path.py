@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from bson import ObjectId
+from app.core.config import settings
+from app.models.warehouse import Container, Storage
+
+
+class CodePathIndex:
+    """In-memory index of location/storage/container code paths.
+
+    Maps a scanned path to its container's _id, so a warm lookup is a
+    single _id fetch instead of a code query plus the legacy storage check.
+    Only the mapping is cached; the document, with its counters and
+    version, is always read live. Entries are invalidated by the create
+    handlers.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str, str], ObjectId]" = OrderedDict()
+        self._generation = 0
+
+    async def _load(self, location: str, storage: str, container: str):
+        document = await Container.get_motor_collection().find_one(
+            {
+                "location_code": {"$in": [location, None]},
+                "storage_code": storage,
+                "code": container,
+            }
+        )
+        if document is None:
+            return None
+        if document.get("location_code") is None:
+            # Containers written before location_code was denormalized.
+            if not await Storage.get_motor_collection().find_one(
+                {"location_code": location, "code": storage}, {"_id": 1}
+            ):
+                return None
+        return document
+
+    async def resolve(
+        self, location: str, storage: str, container: str
+    ) -> Optional[dict]:
+        key = (location, storage, container)
+        container_id = self._entries.get(key)
+        document = None
+        if container_id is not None:
+            self._entries.move_to_end(key)
+            document = await Container.get_motor_collection().find_one(
+                {"_id": container_id}
+            )
+
+        if document is None:
+            generation = self._generation
+            document = await self._load(location, storage, container)
+            if document is None:
+                self._entries.pop(key, None)
+                return None
+            if generation == self._generation:
+                self._entries[key] = document["_id"]
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+
+        document["id"] = str(document.pop("_id"))
+        return document
+
+    def invalidate(
+        self,
+        location: Optional[str] = None,
+        storage: Optional[str] = None,
+        container: Optional[str] = None,
+    ):
+        """Drop every entry under the given path prefix (all when empty)."""
+        self._generation += 1
+        prefix = tuple(
+            code for code in (location, storage, container) if code is not None
+        )
+        for key in [key for key in self._entries if key[: len(prefix)] == prefix]:
+            del self._entries[key]
+
+
+code_path_index = CodePathIndex(settings.CODE_PATH_CACHE_SIZE)
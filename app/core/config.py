@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List, Literal, Optional, Union
 
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings
@@ -14,6 +14,30 @@ class Settings(BaseSettings):
     API_CLIENT_ID: str
     API_PRIVATE_KEY_FILE: str
     ZITADEL_TOKEN_URL: str
+    ZITADEL_TIMEOUT: float = 5.0
+    ZITADEL_CONNECT_TIMEOUT: float = 2.0
+    ZITADEL_MAX_CONNECTIONS: int = 20
+    ZITADEL_MAX_CONCURRENCY: int = 50
+    TOKEN_VALIDATION_MODE: Literal["introspection", "jwt"] = "introspection"
+    ZITADEL_JWKS_URL: Optional[str] = None
+    JWKS_MIN_REFRESH_INTERVAL: int = 60
+    JWT_ALGORITHMS: List[str] = ["RS256"]
+    JWT_AUDIENCE: Optional[str] = None
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_MAX_TTL: int = 60
+    TOKEN_CACHE_NEGATIVE_TTL: int = 10
+    PERMISSION_CACHE_TTL: int = 60
+    PERMISSION_CACHE_MAX_SIZE: int = 10000
+    PERMISSION_CHANGE_STREAM: bool = False
+    THUMBNAIL_WORKERS: int = 2
+    BULK_MAX_ITEMS: int = 1000
+    BATCH_MAX_IDS: int = 500
+    CODE_PATH_CACHE_SIZE: int = 10000
+    RESPONSE_CACHE_SIZE: int = 0
+    SYNC_LAG_SECONDS: int = 5
+    CHANGE_FEED: bool = False
+    CHANGE_FEED_QUEUE_SIZE: int = 100
+    CHANGE_FEED_HEARTBEAT: int = 15
 
     @validator("BACKEND_CORS_ORIGINS", pre=True)
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
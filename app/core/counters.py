@@ -0,0 +1,195 @@
+"""Denormalized child counts kept on locations, storages and containers.
+
+Create handlers increment them together with the parent's version; the
+reconcile job recomputes them from the child collections and fixes drift.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.core.hierarchy import ContainerHierarchy
+from app.core.versions import bump, touch
+from app.models.warehouse import Container, Item, Location, Storage
+
+
+BATCH_SIZE = 500
+COUNTER_FIELDS = {
+    Location: ("storage_count", "container_count", "item_count"),
+    Storage: ("container_count", "item_count"),
+    Container: ("item_count",),
+}
+
+
+class BackfillRequired(Exception):
+    """Containers or items still lack their denormalized location_code."""
+
+
+async def _unbackfilled() -> bool:
+    for document_model in (Container, Item):
+        if await document_model.get_motor_collection().find_one(
+            {"location_code": None}, {"_id": 1}
+        ):
+            return True
+    return False
+
+
+async def count_storage(location_code: str):
+    await touch(Location, {"code": location_code}, {"storage_count": 1})
+
+
+async def count_container(location_code: str, storage_code: str):
+    await touch(
+        Storage,
+        {"location_code": location_code, "code": storage_code},
+        {"container_count": 1},
+    )
+    await touch(Location, {"code": location_code}, {"container_count": 1})
+
+
+async def count_items(containers: Iterable[ContainerHierarchy]):
+    """Count one new item per entry against its container and ancestors."""
+    per_container = Counter(
+        (c.location_code, c.storage_code, c.container_code) for c in containers
+    )
+    if not per_container:
+        return
+
+    per_storage, per_location = Counter(), Counter()
+    for (location_code, storage_code, _), count in per_container.items():
+        per_storage[(location_code, storage_code)] += count
+        per_location[location_code] += count
+
+    # Container codes are only unique within a storage, and storage codes
+    # within a location; containers written before location_code was
+    # denormalized carry none.
+    await _increment(
+        Container,
+        [
+            (
+                {
+                    "location_code": {"$in": [location_code, None]},
+                    "storage_code": storage_code,
+                    "code": code,
+                },
+                count,
+            )
+            for (location_code, storage_code, code), count in per_container.items()
+        ],
+    )
+    await _increment(
+        Storage,
+        [
+            ({"location_code": location_code, "code": code}, count)
+            for (location_code, code), count in per_storage.items()
+        ],
+    )
+    await _increment(
+        Location,
+        [({"code": code}, count) for code, count in per_location.items()],
+    )
+
+
+async def _increment(document_model, counts: List[Tuple[dict, int]]):
+    await document_model.get_motor_collection().bulk_write(
+        [UpdateOne(query, bump({"item_count": count})) for query, count in counts],
+        ordered=False,
+    )
+
+
+async def _read(document_model, query: dict, keys: Tuple[str, ...]) -> Dict:
+    """Current counters of the matching documents, by their code path."""
+    fields = COUNTER_FIELDS[document_model]
+    projection = {name: 1 for name in keys + fields}
+    documents = {}
+    async for document in document_model.get_motor_collection().find(
+        query, projection
+    ):
+        documents[tuple(document.get(key) for key in keys)] = document
+    return documents
+
+
+async def reconcile(location_code: Optional[str] = None) -> int:
+    """Recompute the counters of one location, or of all of them, and fix
+    the documents that drifted. Returns the number of documents fixed.
+
+    Item counts come from one aggregation over the items; container and
+    storage counts from the container and storage documents read first.
+    Corrections are $inc deltas guarded on the counter value read at the
+    start, so a document whose counters change during the run is left
+    alone rather than overwritten. An item inserted but not yet counted
+    while reconcile runs can still be counted twice, so run it while
+    writes to the location are quiet.
+
+    Counts are grouped by the denormalized location/storage codes, so
+    app.tasks.backfill_hierarchy must have run first: while any container
+    or item lacks them this raises BackfillRequired instead of writing
+    zero counts for the containers those documents belong to.
+    """
+    if await _unbackfilled():
+        raise BackfillRequired(
+            "Run app.tasks.backfill_hierarchy before reconciling counters"
+        )
+    scope = {} if location_code is None else {"location_code": location_code}
+    location_scope = {} if location_code is None else {"code": location_code}
+    documents = {
+        Container: await _read(
+            Container, scope, ("location_code", "storage_code", "code")
+        ),
+        Storage: await _read(Storage, scope, ("location_code", "code")),
+        Location: await _read(Location, location_scope, ("code",)),
+    }
+
+    expected = {document_model: Counter() for document_model in documents}
+    for location, storage, _ in documents[Container]:
+        expected[Storage][(location, storage, "container_count")] += 1
+        expected[Location][(location, "container_count")] += 1
+    for location, _ in documents[Storage]:
+        expected[Location][(location, "storage_count")] += 1
+
+    pipeline = [
+        {"$match": scope},
+        {
+            "$group": {
+                "_id": {
+                    "location_code": "$location_code",
+                    "storage_code": "$storage_code",
+                    "container_code": "$container_code",
+                },
+                "count": {"$sum": 1},
+            }
+        },
+    ]
+    async for row in Item.get_motor_collection().aggregate(pipeline):
+        location = row["_id"].get("location_code")
+        storage = row["_id"].get("storage_code")
+        container = row["_id"].get("container_code")
+        count = row["count"]
+        expected[Container][(location, storage, container, "item_count")] += count
+        expected[Storage][(location, storage, "item_count")] += count
+        expected[Location][(location, "item_count")] += count
+
+    fixed = 0
+    for document_model, by_key in documents.items():
+        collection = document_model.get_motor_collection()
+        batch = []
+        for key, document in by_key.items():
+            current = {
+                field: document.get(field) for field in COUNTER_FIELDS[document_model]
+            }
+            deltas = {
+                field: expected[document_model][key + (field,)] - (value or 0)
+                for field, value in current.items()
+            }
+            deltas = {field: delta for field, delta in deltas.items() if delta}
+            if not deltas:
+                continue
+            guard = {field: current[field] for field in deltas}
+            batch.append(
+                UpdateOne({"_id": document["_id"], **guard}, bump(inc=deltas))
+            )
+            if len(batch) >= BATCH_SIZE:
+                result = await collection.bulk_write(batch, ordered=False)
+                fixed += result.modified_count
+                batch = []
+        if batch:
+            fixed += (await collection.bulk_write(batch, ordered=False)).modified_count
+    return fixed
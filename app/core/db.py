@@ -1,10 +1,61 @@
 import motor.motor_asyncio
-from beanie import Document
+from typing import List
+from beanie import Document, init_beanie
 from app.core.config import settings
+from app.core.metrics import CommandTimer
+from app.models.warehouse import Location, PermissionRole, Storage, Container, Item
 from datetime import datetime
 
 
 client = motor.motor_asyncio.AsyncIOMotorClient(
-    settings.DATABASE_URL, uuidRepresentation="standard"
+    settings.DATABASE_URL,
+    uuidRepresentation="standard",
+    event_listeners=[CommandTimer()],
 )
 db = client["warehouse"]
+
+document_models = [
+    Location,
+    PermissionRole,
+    Storage,
+    Container,
+    Item,
+]
+
+
+async def init_db():
+    # Indexes declared on the models are created here and indexes that are no
+    # longer declared (such as the old TEXT indexes on code fields) dropped.
+    await init_beanie(
+        database=db, document_models=document_models, allow_index_dropping=True
+    )
+
+
+async def explain(document_model, query: dict, sort=None) -> dict:
+    """Run explain() for a find on a model's collection."""
+    cursor = document_model.get_motor_collection().find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    return await cursor.explain()
+
+
+def plan_stages(explain_result: dict) -> List[str]:
+    """All stages of the winning plan, e.g. ["FETCH", "IXSCAN"].
+
+    Useful in tests to assert a query is served by an index rather than a
+    COLLSCAN.
+    """
+    stages = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if isinstance(node.get("stage"), str):
+                stages.append(node["stage"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain_result.get("queryPlanner", {}).get("winningPlan", {}))
+    return stages
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+from typing import AsyncIterator, Tuple
+from app.models.warehouse import Container, Item, Storage
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _clean(document: dict) -> dict:
+    document["_id"] = str(document["_id"])
+    return document
+
+
+async def export_records(location: dict) -> AsyncIterator[Tuple[str, dict]]:
+    """Yield ("location" | "storage" | "container" | "item", document) records.
+
+    The whole tree is read with three cursor queries (storages, containers,
+    items); children reference their parent by code. Only the storage and
+    container codes are held in memory, never the documents themselves.
+    """
+    code = location["code"]
+    yield "location", _clean(location)
+
+    storage_codes = []
+    async for storage in Storage.get_motor_collection().find({"location_code": code}):
+        storage_codes.append(storage["code"])
+        yield "storage", _clean(storage)
+
+    container_codes = []
+    async for container in Container.get_motor_collection().find(
+        {
+            "storage_code": {"$in": storage_codes},
+            "location_code": {"$in": [code, None]},
+        }
+    ):
+        container_codes.append(container["code"])
+        yield "container", _clean(container)
+
+    async for item in Item.get_motor_collection().find(
+        {
+            "container_code": {"$in": container_codes},
+            "location_code": {"$in": [code, None]},
+        }
+    ):
+        yield "item", _clean(item)
+
+
+async def export_ndjson(location: dict) -> AsyncIterator[str]:
+    async for kind, document in export_records(location):
+        yield json.dumps({"type": kind, "data": document}, default=json_default) + "\n"
+
+
+async def export_tree(location: dict) -> dict:
+    """The nested location -> storages -> containers -> items export."""
+    tree = {"location": None, "storages": []}
+    storages = {}
+    # Container codes are only unique within a storage.
+    containers = {}
+    containers_by_code = {}
+    async for kind, document in export_records(location):
+        if kind == "location":
+            tree["location"] = document
+        elif kind == "storage":
+            storages[document["code"]] = {"storage": document, "containers": []}
+            tree["storages"].append(storages[document["code"]])
+        elif kind == "container":
+            entry = {"container": document, "items": []}
+            containers[(document["storage_code"], document["code"])] = entry
+            containers_by_code.setdefault(document["code"], entry)
+            storages[document["storage_code"]]["containers"].append(entry)
+        else:
+            entry = containers.get(
+                (document.get("storage_code"), document["container_code"])
+            )
+            if entry is None:
+                # Items written before storage_code was denormalized.
+                entry = containers_by_code[document["container_code"]]
+            entry["items"].append(document)
+    return tree
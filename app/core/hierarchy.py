@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from app.core.permissions import permission_cache
+from app.models.warehouse import Container, Item, Storage
+
+
+@dataclass
+class ContainerHierarchy:
+    container_code: str
+    storage_code: str
+    location_code: str
+    role: Optional[str]
+
+
+@dataclass
+class ItemHierarchy(ContainerHierarchy):
+    item: Item
+
+
+async def _container_ancestry(container_code: str) -> dict:
+    """Container -> Storage -> location_code in one round trip."""
+    container = await Container.get_motor_collection().find_one(
+        {"code": container_code}, {"storage_code": 1, "location_code": 1}
+    )
+    if container is None:
+        raise HTTPException(status_code=404, detail="Container not found")
+    if container.get("location_code"):
+        return container
+
+    # Containers written before location_code was denormalized.
+    ancestry = await Container.aggregate(
+        [
+            {"$match": {"_id": container["_id"]}},
+            {
+                "$lookup": {
+                    "from": Storage.get_motor_collection().name,
+                    "localField": "storage_code",
+                    "foreignField": "code",
+                    "as": "storage",
+                }
+            },
+            {
+                "$project": {
+                    "storage_code": 1,
+                    "location_code": {"$arrayElemAt": ["$storage.location_code", 0]},
+                }
+            },
+        ]
+    ).to_list(1)
+    if not ancestry or not ancestry[0].get("location_code"):
+        raise HTTPException(status_code=404, detail="Storage not found")
+    return ancestry[0]
+
+
+async def resolve_container(container_code: str, user: dict) -> ContainerHierarchy:
+    """Resolve a container's storage, location and the caller's role there."""
+    ancestry = await _container_ancestry(container_code)
+    return ContainerHierarchy(
+        container_code=container_code,
+        storage_code=ancestry["storage_code"],
+        location_code=ancestry["location_code"],
+        role=await permission_cache.role(user["sub"], ancestry["location_code"]),
+    )
+
+
+async def resolve_containers(
+    container_codes: Iterable[str], user: dict
+) -> Dict[str, ContainerHierarchy]:
+    """Resolve many containers at once: one query for the containers, one for
+    any storages still needed, and the caller's cached role map.
+
+    Codes that don't resolve to a container are missing from the result.
+    """
+    container_codes = list(set(container_codes))
+    if not container_codes:
+        return {}
+
+    containers = {}
+    async for container in Container.get_motor_collection().find(
+        {"code": {"$in": container_codes}},
+        {"code": 1, "storage_code": 1, "location_code": 1},
+    ):
+        containers.setdefault(container["code"], container)
+
+    legacy = {
+        container["storage_code"]
+        for container in containers.values()
+        if not container.get("location_code")
+    }
+    storages = {}
+    if legacy:
+        async for storage in Storage.get_motor_collection().find(
+            {"code": {"$in": list(legacy)}}, {"code": 1, "location_code": 1}
+        ):
+            storages.setdefault(storage["code"], storage["location_code"])
+
+    roles = await permission_cache.roles(user["sub"])
+    resolved = {}
+    for code, container in containers.items():
+        location_code = container.get("location_code") or storages.get(
+            container["storage_code"]
+        )
+        if location_code is None:
+            continue
+        resolved[code] = ContainerHierarchy(
+            container_code=code,
+            storage_code=container["storage_code"],
+            location_code=location_code,
+            role=roles.get(location_code),
+        )
+    return resolved
+
+
+async def resolve_item(item_id: str, user: dict) -> ItemHierarchy:
+    """Resolve an item's full ancestry and the caller's role in its location.
+
+    Items carrying the denormalized storage/location codes need a single
+    query; older documents fall back to one $lookup on the container.
+    """
+    try:
+        item = await Item.get(PydanticObjectId(item_id))
+    except (InvalidId, TypeError):
+        item = None
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    if item.location_code and item.storage_code:
+        storage_code, location_code = item.storage_code, item.location_code
+    else:
+        ancestry = await _container_ancestry(item.container_code)
+        storage_code, location_code = (
+            ancestry["storage_code"],
+            ancestry["location_code"],
+        )
+
+    return ItemHierarchy(
+        item=item,
+        container_code=item.container_code,
+        storage_code=storage_code,
+        location_code=location_code,
+        role=await permission_cache.role(user["sub"], location_code),
+    )
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Optional
+import httpx
+from app.core.config import settings
+
+
+class IdentityProviderClient:
+    """Keep-alive HTTP connection pool shared by all calls to Zitadel.
+
+    Opened in the app's startup hook and closed on shutdown, so introspection
+    requests reuse connections instead of paying a TCP/TLS handshake each.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.ZITADEL_TIMEOUT, connect=settings.ZITADEL_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.ZITADEL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ZITADEL_MAX_CONNECTIONS,
+            ),
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(settings.ZITADEL_MAX_CONCURRENCY)
+
+    async def close(self):
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if self._client is None:
+            raise RuntimeError("Identity provider client is not started")
+        async with self._semaphore:
+            return await self._client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+
+idp_client = IdentityProviderClient()
@@ -0,0 +1,373 @@
+import json
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set
+from beanie import PydanticObjectId
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from starlette.concurrency import run_in_threadpool
+from app.core.permissions import ADMIN_ROLES, grant_role, has_role, permission_cache
+from app.core.counters import COUNTER_FIELDS, BackfillRequired, reconcile
+from app.core.validate_code import validate_code
+from app.core.versions import touch
+from app.models.warehouse import Container, Item, Location, Storage
+
+
+MAX_REPORTED_ERRORS = 100
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+CODE_FIELDS = {
+    "location": ["code"],
+    "storage": ["code", "location_code"],
+    "container": ["code", "storage_code"],
+    "item": ["container_code"],
+}
+MODELS = {
+    "location": Location,
+    "storage": Storage,
+    "container": Container,
+    "item": Item,
+}
+
+
+class ImportFailed(Exception):
+    def __init__(self, errors: List[dict], resume_from: int = 0):
+        super().__init__()
+        self.errors = errors
+        self.resume_from = resume_from
+
+
+def parse_records(lines: Iterable[str], first_line: int = 1) -> Iterator[tuple]:
+    """Parse NDJSON export lines into (line_number, type, data) tuples."""
+    for line_number, line in enumerate(lines, start=first_line):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            kind, data = record["type"], record["data"]
+        except (ValueError, KeyError, TypeError):
+            yield line_number, None, None
+            continue
+        yield line_number, kind, data
+
+
+def flatten_tree(tree: dict) -> Iterator[str]:
+    """Turn the nested JSON export into NDJSON export lines."""
+    yield json.dumps({"type": "location", "data": tree["location"]})
+    for storage in tree.get("storages", []):
+        yield json.dumps({"type": "storage", "data": storage["storage"]})
+    for storage in tree.get("storages", []):
+        for container in storage.get("containers", []):
+            yield json.dumps({"type": "container", "data": container["container"]})
+    for storage in tree.get("storages", []):
+        for container in storage.get("containers", []):
+            for item in container.get("items", []):
+                yield json.dumps({"type": "item", "data": item})
+
+
+def normalize(kind: str, data: dict) -> dict:
+    """Validate a record's codes with validate_code and return it normalized."""
+    if kind not in MODELS or not isinstance(data, dict):
+        raise ValueError("Unknown record")
+    data = dict(data)
+    for field in CODE_FIELDS[kind]:
+        code = validate_code(str(data.get(field, "")))
+        if code is None:
+            raise ValueError(f"Invalid {kind} {field}: {data.get(field)!r}")
+        data[field] = code
+    if kind == "item" and data.get("storage_code") is not None:
+        code = validate_code(str(data["storage_code"]))
+        if code is None:
+            raise ValueError(f"Invalid item storage_code: {data['storage_code']!r}")
+        data["storage_code"] = code
+    return data
+
+
+def item_storage(data: dict, container_storages: Dict[str, Set[str]]) -> str:
+    """The storage an item record belongs to.
+
+    Container codes are only unique within a storage, so this is the
+    item's exported storage_code; exports that predate that field fall back
+    to the container code, which must then name a single container.
+    """
+    storages = container_storages.get(data["container_code"], set())
+    storage_code = data.get("storage_code")
+    if storage_code is None:
+        if len(storages) > 1:
+            raise ValueError(
+                "Item container code is used in several storages; "
+                "storage_code is required"
+            )
+        storage_code = next(iter(storages), None)
+    if storage_code not in storages:
+        raise ValueError("Item references unknown container")
+    return storage_code
+
+
+class ImportValidator:
+    """First pass over an import: checks every record before anything is
+    written. Only codes are kept in memory."""
+
+    def __init__(self):
+        self.location_code: Optional[str] = None
+        self.storages = set()
+        # Container code -> codes of the storages holding such a container.
+        self.containers: Dict[str, Set[str]] = {}
+        self.total = 0
+        self.errors: List[dict] = []
+
+    def error(self, line_number: int, detail: str):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "detail": detail})
+
+    def feed(self, line_number: int, kind: Optional[str], data: Optional[dict]):
+        self.total += 1
+        if kind is None:
+            return self.error(line_number, "Malformed record")
+        try:
+            data = normalize(kind, data)
+        except ValueError as e:
+            return self.error(line_number, str(e))
+
+        if kind == "location":
+            if self.location_code is not None:
+                return self.error(line_number, "Only one location can be imported")
+            self.location_code = data["code"]
+        elif self.location_code is None:
+            return self.error(line_number, "The location record must come first")
+        elif kind == "storage":
+            if data["location_code"] != self.location_code:
+                return self.error(line_number, "Storage belongs to another location")
+            self.storages.add(data["code"])
+        elif kind == "container":
+            if data["storage_code"] not in self.storages:
+                return self.error(line_number, "Container references unknown storage")
+            self.containers.setdefault(data["code"], set()).add(data["storage_code"])
+        else:
+            try:
+                item_storage(data, self.containers)
+            except ValueError as e:
+                return self.error(line_number, str(e))
+            if _item_id(data) is not None and not ObjectId.is_valid(_item_id(data)):
+                return self.error(line_number, "Invalid item id")
+
+        try:
+            MODELS[kind].model_validate(_fields(kind, data))
+        except ValidationError as e:
+            self.error(line_number, f"Invalid {kind}: {e.errors()[0]['msg']}")
+
+    def finish(self):
+        if self.location_code is None:
+            self.error(0, "No location record")
+        if self.errors:
+            raise ImportFailed(self.errors)
+
+
+def _fields(kind: str, data: dict) -> dict:
+    fields = set(MODELS[kind].model_fields) - {"id", "revision_id"}
+    return {key: value for key, value in data.items() if key in fields}
+
+
+def _item_id(data: dict):
+    """The exported id of an item record, if it has one."""
+    return data.get("_id") or data.get("id")
+
+
+def _upsert(document: dict, now: datetime) -> dict:
+    return {
+        "$set": {**document, "updated_at": now},
+        "$setOnInsert": {"created_at": now},
+    }
+
+
+class LocationImporter:
+    """Second pass: writes validated records with ordered bulk writes.
+
+    Locations, storages and containers are upserted by code and items by
+    their exported id, so a failed import can be resumed from the last
+    checkpoint (or simply re-run) without duplicating documents.
+
+    admin_user_id, when set, is made admin of the location once its record
+    is written (see prepare_location).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        resume_from: int = 0,
+        admin_user_id: Optional[str] = None,
+    ):
+        self.batch_size = batch_size
+        self.resume_from = resume_from
+        self.admin_user_id = admin_user_id
+        # Records written by this run; position counts the skipped ones too.
+        self.imported = 0
+        self.location_code: Optional[str] = None
+        self.container_storages: Dict[str, Set[str]] = {}
+
+    def operation(self, kind: str, data: dict):
+        # Versions are only ever bumped and counters are recomputed once
+        # the import is done; neither is taken from the export.
+        model = MODELS[kind]
+        # Unset optional fields are left out rather than written as null,
+        # which the models would fail to load (e.g. description: str = None).
+        document = model.model_validate(_fields(kind, data)).model_dump(
+            exclude={"id", "revision_id", "version", "created_at", "updated_at"}
+            | set(COUNTER_FIELDS.get(model, ())),
+            exclude_none=True,
+        )
+        now = datetime.utcnow()
+        if kind == "location":
+            return UpdateOne(
+                {"code": data["code"]}, _upsert(document, now), upsert=True
+            )
+        if kind == "storage":
+            return UpdateOne(
+                {"location_code": self.location_code, "code": data["code"]},
+                _upsert(document, now),
+                upsert=True,
+            )
+        if kind == "container":
+            document["location_code"] = self.location_code
+            return UpdateOne(
+                {
+                    "location_code": self.location_code,
+                    "storage_code": data["storage_code"],
+                    "code": data["code"],
+                },
+                _upsert(document, now),
+                upsert=True,
+            )
+
+        document["location_code"] = self.location_code
+        document["storage_code"] = item_storage(data, self.container_storages)
+        item_id = _item_id(data)
+        if item_id is None:
+            return InsertOne({**document, "created_at": now, "updated_at": now})
+        # Scoped to the location so an id that exists elsewhere fails with a
+        # duplicate key error instead of moving that item here.
+        return UpdateOne(
+            {"_id": PydanticObjectId(item_id), "location_code": self.location_code},
+            _upsert(document, now),
+            upsert=True,
+        )
+
+    async def _write(self, kind: str, batch: List):
+        try:
+            await MODELS[kind].get_motor_collection().bulk_write(batch, ordered=True)
+        except BulkWriteError as e:
+            # Ordered writes stop at the first error; everything before it
+            # is already imported.
+            error = e.details["writeErrors"][0]
+            raise ImportFailed(
+                [{"detail": error["errmsg"]}],
+                resume_from=self.position + error["index"],
+            )
+        except PyMongoError as e:
+            raise ImportFailed([{"detail": str(e)}], resume_from=self.position)
+        self.imported += len(batch)
+        if kind == "location" and self.admin_user_id is not None:
+            await grant_role(self.admin_user_id, self.location_code, "admin")
+
+    @property
+    def position(self) -> int:
+        """Number of records handled so far, counting from the file start."""
+        return self.resume_from + self.imported
+
+    async def run(self, records: AsyncIterator[tuple]) -> AsyncIterator[int]:
+        """Write all records, yielding the position after each batch.
+
+        Records before resume_from are only read to rebuild the code maps.
+        """
+        index = 0
+        kind, batch = None, []
+        try:
+            async for _, record_kind, data in records:
+                data = normalize(record_kind, data)
+                if record_kind == "location":
+                    self.location_code = data["code"]
+                elif record_kind == "container":
+                    self.container_storages.setdefault(data["code"], set()).add(
+                        data["storage_code"]
+                    )
+
+                index += 1
+                if index <= self.resume_from:
+                    continue
+                if batch and (record_kind != kind or len(batch) >= self.batch_size):
+                    await self._write(kind, batch)
+                    batch = []
+                    yield self.position
+                kind = record_kind
+                batch.append(self.operation(record_kind, data))
+
+            if batch:
+                await self._write(kind, batch)
+                yield self.position
+        finally:
+            if self.imported and self.location_code:
+                await self.touch()
+
+    async def touch(self):
+        """Recompute the counters and bump the versions of everything in
+        the imported location once all writes are done, so cached responses
+        for it are revalidated."""
+        try:
+            await reconcile(self.location_code)
+        except BackfillRequired:
+            # Other documents are not backfilled yet; the counters are set
+            # by the reconcile job once backfill_hierarchy has run.
+            pass
+        query = {"location_code": self.location_code}
+        await touch(Location, {"code": self.location_code})
+        await touch(Storage, query)
+        await touch(Container, query)
+
+
+async def prepare_location(location_code: str, user_id: str) -> Optional[str]:
+    """Make sure the importing user may write to the location.
+
+    Importing into an existing location needs the admin role. For a new
+    location, returns the user to make its admin, which LocationImporter
+    does once the location record is written, so a failed import leaves
+    no grant behind.
+    """
+    if await Location.find_one(Location.code == location_code):
+        if not await has_role(user_id, location_code, ADMIN_ROLES):
+            raise ImportFailed(
+                [{"detail": "User does not have permission to import this location"}]
+            )
+    elif await permission_cache.role(user_id, location_code) is None:
+        return user_id
+    return None
+
+
+async def spool_stream(stream: AsyncIterator[bytes]):
+    """Copy a request body to a temp file so it can be read twice."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in stream:
+        await run_in_threadpool(spool.write, chunk)
+    return spool
+
+
+def validate_spool(spool) -> ImportValidator:
+    """Run the validation pass over a spooled NDJSON file. Blocking."""
+    spool.seek(0)
+    validator = ImportValidator()
+    lines = (line.decode("utf-8", "replace") for line in spool)
+    for line_number, kind, data in parse_records(lines):
+        validator.feed(line_number, kind, data)
+    validator.finish()
+    return validator
+
+
+async def spool_records(spool) -> AsyncIterator[tuple]:
+    """Parse the records of a spooled NDJSON file, reading off the event loop."""
+    await run_in_threadpool(spool.seek, 0)
+    line_number = 1
+    while lines := await run_in_threadpool(spool.readlines, 1 << 20):
+        decoded = [line.decode("utf-8", "replace") for line in lines]
+        for record in parse_records(decoded, line_number):
+            yield record
+        line_number += len(lines)
@@ -0,0 +1,137 @@
+"""Per-request instrumentation: DB round trips, auth and render time.
+
+MetricsMiddleware gives every HTTP request a RequestStats in a context
+variable. The pymongo command listener, auth_required and the JSON
+response class add to it, and the middleware reports the totals in a
+Server-Timing header and in the Prometheus histograms served at /metrics.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from prometheus_client import Histogram
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_time: float = 0.0
+    auth_time: float = 0.0
+    render_time: float = 0.0
+
+    def server_timing(self, total: float) -> str:
+        return ", ".join(
+            [
+                f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries"',
+                f"auth;dur={self.auth_time * 1000:.2f}",
+                f"render;dur={self.render_time * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            ]
+        )
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+@contextmanager
+def timed(field: str):
+    """Add the time spent in the block to a field of the request's stats."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = request_stats.get()
+        if stats is not None:
+            setattr(stats, field, getattr(stats, field) + time.perf_counter() - start)
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Counts Mongo commands and their duration against the current request.
+
+    Motor runs pymongo on worker threads with a copy of the caller's
+    context, so request_stats resolves to the request that issued the
+    command.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        stats = request_stats.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += event.duration_micros / 1e6
+
+
+LABELS = ["method", "route"]
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency", LABELS
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Mongo commands per request",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in Mongo per request", LABELS
+)
+REQUEST_AUTH_TIME = Histogram(
+    "http_request_auth_seconds", "Time spent authenticating per request", LABELS
+)
+REQUEST_RENDER_TIME = Histogram(
+    "http_request_render_seconds", "Time spent rendering JSON per request", LABELS
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so the endpoint runs in the context it sets.
+
+    Server-Timing is sent with the response headers; for streaming
+    responses it covers the time until the first byte, the histograms the
+    whole response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", stats.server_timing(time.perf_counter() - start)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+            # Label by route template, not path, to keep cardinality bounded.
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route else "unmatched")
+            REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+            REQUEST_DB_QUERIES.labels(*labels).observe(stats.db_queries)
+            REQUEST_DB_TIME.labels(*labels).observe(stats.db_time)
+            REQUEST_AUTH_TIME.labels(*labels).observe(stats.auth_time)
+            REQUEST_RENDER_TIME.labels(*labels).observe(stats.render_time)
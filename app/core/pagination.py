@@ -0,0 +1,89 @@
+import base64
+import binascii
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Query
+from pymongo import ASCENDING
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(object_id) -> str:
+    return base64.urlsafe_b64encode(ObjectId(object_id).binary).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PageParams:
+    """Query parameters of a keyset-paginated listing."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = Query(
+            None, description="Comma-separated list of fields to return"
+        ),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = fields
+
+    def includes(self, name: str) -> bool:
+        """Whether a field is part of the requested projection."""
+        if not self.fields:
+            return True
+        return name in [field.strip() for field in self.fields.split(",")]
+
+    def projection(self, document_model, exclude=()) -> Optional[dict]:
+        """Mongo projection for the requested fields, or None for all fields."""
+        if not self.fields:
+            if not exclude:
+                return None
+            return {name: 0 for name in exclude}
+
+        allowed = set(document_model.model_fields) - {"id", "revision_id"}
+        names = [name.strip() for name in self.fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+        return {name: 1 for name in names}
+
+
+async def paginate(
+    document_model, query: dict, page: PageParams, exclude=()
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page of raw documents ordered by _id.
+
+    Returns the documents with "_id" turned into an "id" string, and the
+    cursor of the next page (None on the last page).
+    """
+    if page.cursor:
+        query = {**query, "_id": {"$gt": decode_cursor(page.cursor)}}
+
+    documents = (
+        await document_model.get_motor_collection()
+        .find(query, page.projection(document_model, exclude))
+        .sort("_id", ASCENDING)
+        .limit(page.limit + 1)
+        .to_list(page.limit + 1)
+    )
+
+    next_cursor = None
+    if len(documents) > page.limit:
+        documents = documents[: page.limit]
+        next_cursor = encode_cursor(documents[-1]["_id"])
+
+    for document in documents:
+        document["id"] = str(document.pop("_id"))
+    return documents, next_cursor
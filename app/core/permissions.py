@@ -0,0 +1,110 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from fastapi import HTTPException
+from app.core.config import settings
+from app.models.warehouse import PermissionRole
+
+
+logger = logging.getLogger(__name__)
+
+VIEW_ROLES = ("admin", "editor", "viewer")
+EDIT_ROLES = ("admin", "editor")
+ADMIN_ROLES = ("admin",)
+
+
+class PermissionCache:
+    """Each user's location_code -> role map, cached in memory with a TTL."""
+
+    def __init__(self, ttl: int, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, str]]]" = (
+            OrderedDict()
+        )
+        self._generation = 0
+
+    async def roles(self, user_id: str) -> Dict[str, str]:
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+        generation = self._generation
+        roles = {
+            role.location_code: role.role
+            async for role in PermissionRole.find(PermissionRole.user_id == user_id)
+        }
+        # Don't cache a map that was loaded while an invalidation happened.
+        if generation == self._generation and self.max_size > 0:
+            self._entries[user_id] = (time.monotonic() + self.ttl, roles)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return roles
+
+    async def role(self, user_id: str, location_code: str) -> Optional[str]:
+        return (await self.roles(user_id)).get(location_code)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        self._generation += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+
+permission_cache = PermissionCache(
+    ttl=settings.PERMISSION_CACHE_TTL, max_size=settings.PERMISSION_CACHE_MAX_SIZE
+)
+
+
+async def has_role(user_id: str, location_code: str, roles: Iterable[str]) -> bool:
+    return await permission_cache.role(user_id, location_code) in roles
+
+
+async def require_role(
+    user: dict, location_code: str, roles: Iterable[str], detail: str
+):
+    if not await has_role(user["sub"], location_code, roles):
+        raise HTTPException(status_code=403, detail=detail)
+
+
+async def grant_role(user_id: str, location_code: str, role: str) -> PermissionRole:
+    """Create a role and invalidate the user's cached role map.
+
+    Every role write should go through here so the cache stays coherent.
+    """
+    permission_role = await PermissionRole.create(
+        PermissionRole(user_id=user_id, location_code=location_code, role=role)
+    )
+    permission_cache.invalidate(user_id)
+    return permission_role
+
+
+async def watch_role_changes():
+    """Invalidate cached roles on writes made by other workers.
+
+    Needs MongoDB running as a replica set; enable with
+    PERMISSION_CHANGE_STREAM.
+    """
+    collection = PermissionRole.get_motor_collection()
+    resume_after = None
+    while True:
+        try:
+            async with collection.watch(
+                full_document="updateLookup", resume_after=resume_after
+            ) as stream:
+                async for change in stream:
+                    resume_after = stream.resume_token
+                    document = change.get("fullDocument") or {}
+                    # Deletes don't carry the document, so drop everything.
+                    permission_cache.invalidate(document.get("user_id"))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Role change stream failed, restarting")
+            permission_cache.invalidate()
+            await asyncio.sleep(5)
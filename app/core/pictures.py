@@ -0,0 +1,148 @@
+import os
+import re
+import hashlib
+import tempfile
+from datetime import datetime
+from os import path as os_path
+from typing import AsyncIterator, Optional, Tuple
+import anyio
+from fastapi import HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.caching import http_date, is_not_modified, strong_etag_matches
+from app.models.warehouse import Picture
+
+
+PICTURES_DIR = "static"
+CHUNK_SIZE = 1024 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def picture_path(item_id) -> str:
+    return os_path.join(PICTURES_DIR, f"{item_id}.jpg")
+
+
+def _write_chunk(buffer, sha256, chunk: bytes):
+    sha256.update(chunk)
+    buffer.write(chunk)
+
+
+def _remove(file_path: str):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_picture(upload: UploadFile, destination: str) -> Picture:
+    """Stream an upload to disk chunk by chunk, off the event loop.
+
+    The data goes to a temporary file next to the destination which is then
+    atomically renamed, so readers never see a partially written picture.
+    """
+    fd, tmp_path = await run_in_threadpool(
+        tempfile.mkstemp, dir=os_path.dirname(destination), suffix=".tmp"
+    )
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while chunk := await upload.read(CHUNK_SIZE):
+                await run_in_threadpool(_write_chunk, buffer, sha256, chunk)
+                size += len(chunk)
+        await run_in_threadpool(os.replace, tmp_path, destination)
+    except BaseException:
+        await run_in_threadpool(_remove, tmp_path)
+        raise
+
+    now = datetime.utcnow()
+    return Picture(
+        size=size,
+        sha256=sha256.hexdigest(),
+        # Mongo keeps milliseconds; truncate so Last-Modified stays stable.
+        updated_at=now.replace(microsecond=now.microsecond // 1000 * 1000),
+    )
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=" range into inclusive (start, end) offsets.
+
+    Returns None when the whole file should be sent (no or multi-range
+    header) and raises 416 when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+async def _file_chunks(file_path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(file_path, "rb") as f:
+        await f.seek(start)
+        while length > 0:
+            chunk = await f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def picture_response(
+    request: Request, file_path: str, picture: Picture, variant: str = ""
+) -> Response:
+    """Serve a picture with ETag/Last-Modified validators and Range support."""
+    etag = f'"{picture.sha256}{variant}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(picture.updated_at),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+    if is_not_modified(request, etag, picture.updated_at):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Picture not found")
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or strong_etag_matches(if_range, etag):
+        byte_range = parse_range(request.headers.get("range"), stat_result.st_size)
+
+    if byte_range is None:
+        return FileResponse(
+            file_path,
+            media_type="image/jpeg",
+            headers=headers,
+            stat_result=stat_result,
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(file_path, start, end - start + 1),
+        status_code=206,
+        media_type="image/jpeg",
+        headers=headers,
+    )
@@ -0,0 +1,28 @@
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from app.core.metrics import timed
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def json_dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class TimedJSONResponse(JSONResponse):
+    """orjson-backed JSONResponse that reports its render time to the
+    request's stats.
+
+    It encodes datetimes and ObjectIds itself, so handlers can return it
+    with raw Motor documents or model_dump() output and skip FastAPI's
+    jsonable_encoder pass.
+    """
+
+    def render(self, content) -> bytes:
+        with timed("render_time"):
+            return json_dumps(content)
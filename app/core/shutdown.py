@@ -0,0 +1,51 @@
+"""Callbacks that run as soon as the server is asked to exit.
+
+Uvicorn handles SIGINT/SIGTERM by closing its listeners and then waiting
+for every in-flight response to complete; the lifespan shutdown event only
+fires after that. Long-lived responses such as event streams therefore
+have to be ended from the exit signal itself, or the server never gets
+past draining them.
+"""
+import logging
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+_callbacks: List[Callable[[], None]] = []
+
+
+def on_exit_signal(callback: Callable[[], None]):
+    """Register a synchronous callback to run when the exit signal arrives."""
+    _callbacks.append(callback)
+
+
+def run_exit_callbacks():
+    for callback in _callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Exit signal callback failed")
+
+
+def install_exit_signal_hook():
+    """Chain run_exit_callbacks in front of uvicorn's exit signal handler.
+
+    Uvicorn binds Server.handle_exit when it installs its signal handlers,
+    after importing the app but before the startup event, so this has to
+    run at import time.
+    """
+    try:
+        from uvicorn.server import Server
+    except ImportError:
+        return
+
+    handle_exit = Server.handle_exit
+    if getattr(handle_exit, "runs_exit_callbacks", False):
+        return
+
+    def handle_exit_with_callbacks(self, *args, **kwargs):
+        run_exit_callbacks()
+        handle_exit(self, *args, **kwargs)
+
+    handle_exit_with_callbacks.runs_exit_callbacks = True
+    Server.handle_exit = handle_exit_with_callbacks
@@ -0,0 +1,39 @@
+from datetime import datetime
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from app.models.warehouse import Item
+
+
+# Items written before quantity existed count as one unit.
+QUANTITY = {"$ifNull": ["$quantity", 1]}
+
+
+async def adjust_stock(item_id: ObjectId, delta: int) -> int:
+    """Add delta to an item's quantity in one atomic update and return the
+    new quantity.
+
+    The non-negative guard is part of the update's filter, so concurrent
+    picks on the same item can never take it below zero. Raises 409 when
+    there is not enough stock and 404 when the item is gone.
+    """
+    updated = await Item.get_motor_collection().find_one_and_update(
+        {"_id": item_id, "$expr": {"$gte": [QUANTITY, -delta]}},
+        [
+            {
+                "$set": {
+                    "quantity": {"$add": [QUANTITY, delta]},
+                    "updated_at": datetime.utcnow(),
+                }
+            }
+        ],
+        projection={"quantity": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated is not None:
+        return updated["quantity"]
+
+    # The filter failed: either the guard or the item itself.
+    if await Item.get_motor_collection().find_one({"_id": item_id}, {"_id": 1}):
+        raise HTTPException(status_code=409, detail="Insufficient stock")
+    raise HTTPException(status_code=404, detail="Item not found")
@@ -0,0 +1,96 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from os import path as os_path
+from typing import Dict, Optional
+from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.pictures import PICTURES_DIR, picture_path
+
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {"thumb": 128, "medium": 512}
+
+
+def variant_path(item_id, variant: str) -> str:
+    if variant == "original":
+        return picture_path(item_id)
+    return os_path.join(PICTURES_DIR, f"{item_id}_{variant}.jpg")
+
+
+def render_variants(source: str, targets: Dict[str, int]):
+    """Resize source into each target path. Runs in a worker process."""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for target, max_side in targets.items():
+            variant = image.copy()
+            variant.thumbnail((max_side, max_side))
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os_path.dirname(target), suffix=".tmp"
+            )
+            with os.fdopen(fd, "wb") as buffer:
+                variant.save(buffer, "JPEG", quality=80, optimize=True)
+            os.replace(tmp_path, target)
+
+
+def _remove_variants(item_id):
+    for variant in VARIANTS:
+        try:
+            os.remove(variant_path(item_id, variant))
+        except FileNotFoundError:
+            pass
+
+
+class ThumbnailPool:
+    """Process pool that renders picture variants away from the event loop."""
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._closed = False
+
+    def start(self):
+        if self._closed:
+            raise RuntimeError("Thumbnail pool is closed")
+        if self._executor is None:
+            # Forking a process that runs an event loop and open sockets is
+            # unsafe; spawn clean interpreters instead.
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def close(self):
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def generate(self, item_id, variants=tuple(VARIANTS)):
+        self.start()
+        targets = {variant_path(item_id, name): VARIANTS[name] for name in variants}
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, render_variants, picture_path(item_id), targets
+        )
+
+    async def pregenerate(self, item_id):
+        """Background variant of generate for freshly uploaded pictures.
+
+        Uploads are not required to be images Pillow can read, and the pool
+        may close while the task is queued; variants are then rendered on
+        demand (or refused with 415) instead of failing the task.
+        """
+        try:
+            await self.generate(item_id)
+        except (OSError, RuntimeError) as error:
+            logger.warning("Skipping thumbnails for item %s: %s", item_id, error)
+
+    async def invalidate(self, item_id):
+        await run_in_threadpool(_remove_variants, item_id)
+
+
+thumbnail_pool = ThumbnailPool()
@@ -0,0 +1,59 @@
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+class TokenCache:
+    """Bounded LRU cache of introspection results keyed by a token hash."""
+
+    def __init__(self, max_size: int, max_ttl: int, negative_ttl: int):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+    @staticmethod
+    def key(token_string: str) -> str:
+        return hashlib.sha256(token_string.encode()).hexdigest()
+
+    def get(self, token_string: str) -> Optional[Dict]:
+        key = self.key(token_string)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, token = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return token
+
+    def set(self, token_string: str, token: Dict):
+        if self.max_size <= 0:
+            return
+        now = time.time()
+        if token and token.get("active"):
+            # Active tokens live until their own exp, capped by max_ttl so a
+            # revocation is picked up within max_ttl seconds.
+            expires_at = min(token.get("exp", now), now + self.max_ttl)
+        else:
+            expires_at = now + self.negative_ttl
+        if expires_at <= now:
+            return
+        key = self.key(token_string)
+        self._entries[key] = (expires_at, token)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    max_ttl=settings.TOKEN_CACHE_MAX_TTL,
+    negative_ttl=settings.TOKEN_CACHE_NEGATIVE_TTL,
+)
@@ -5,15 +5,20 @@ import json
 import jwt
 from typing import Dict
 from authlib.oauth2.rfc7662 import IntrospectTokenValidator
+from cryptography.hazmat.primitives import serialization
 import requests
 from requests.auth import HTTPBasicAuth
 from app.core.config import settings
+from app.core.http_client import idp_client
+from app.core.token_cache import token_cache
 
 
 ZITADEL_DOMAIN = settings.ZITADEL_DOMAIN
 ZITADEL_INTROSPECTION_URL = settings.ZITADEL_INTROSPECTION_URL
 API_PRIVATE_KEY_FILE_PATH = settings.API_PRIVATE_KEY_FILE
 API_PRIVATE_KEY_FILE = {}
+CLIENT_ASSERTION_LIFETIME = 60 * 60  # Expires in 1 hour
+CLIENT_ASSERTION_REFRESH_MARGIN = 5 * 60
 
 
 class ValidatorError(Exception):
@@ -23,48 +28,78 @@ class ValidatorError(Exception):
         self.status_code = status_code
 
 
-class ZitadelIntrospectTokenValidator(IntrospectTokenValidator):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.load_api_private_key(API_PRIVATE_KEY_FILE_PATH)
+def client_assertion():
+    """Signed client-assertion JWT, re-signed only shortly before it expires."""
+    if not API_PRIVATE_KEY_FILE:
+        ZitadelIntrospectTokenValidator.load_api_private_key(API_PRIVATE_KEY_FILE_PATH)
+
+    now = int(time.time())
+    cached = API_PRIVATE_KEY_FILE.get("assertion")
+    if cached and cached["exp"] - CLIENT_ASSERTION_REFRESH_MARGIN > now:
+        return cached["jwt"]
+
+    payload = {
+        "iss": API_PRIVATE_KEY_FILE["client_id"],
+        "sub": API_PRIVATE_KEY_FILE["client_id"],
+        "aud": ZITADEL_DOMAIN,
+        "exp": now + CLIENT_ASSERTION_LIFETIME,
+        "iat": now,
+    }
+    headers = {"alg": "RS256", "kid": API_PRIVATE_KEY_FILE["key_id"]}
+    jwt_token = jwt.encode(
+        payload,
+        API_PRIVATE_KEY_FILE["private_key"],
+        algorithm="RS256",
+        headers=headers,
+    )
+    API_PRIVATE_KEY_FILE["assertion"] = {"jwt": jwt_token, "exp": payload["exp"]}
+    return jwt_token
 
+
+class ZitadelIntrospectTokenValidator(IntrospectTokenValidator):
     @staticmethod
     def load_api_private_key(file_path):
         with open(file_path, "r") as f:
             data = json.load(f)
-            API_PRIVATE_KEY_FILE["client_id"] = data["clientId"]
-            API_PRIVATE_KEY_FILE["key_id"] = data["keyId"]
-            API_PRIVATE_KEY_FILE["private_key"] = data["key"]
-
-    def introspect_token(self, token_string):
-        # Create JWT for client assertion
-        payload = {
-            "iss": API_PRIVATE_KEY_FILE["client_id"],
-            "sub": API_PRIVATE_KEY_FILE["client_id"],
-            "aud": ZITADEL_DOMAIN,
-            "exp": int(time.time()) + 60 * 60,  # Expires in 1 hour
-            "iat": int(time.time()),
-        }
-        headers = {"alg": "RS256", "kid": API_PRIVATE_KEY_FILE["key_id"]}
-        jwt_token = jwt.encode(
-            payload,
-            API_PRIVATE_KEY_FILE["private_key"],
-            algorithm="RS256",
-            headers=headers,
+        API_PRIVATE_KEY_FILE.clear()
+        API_PRIVATE_KEY_FILE["client_id"] = data["clientId"]
+        API_PRIVATE_KEY_FILE["key_id"] = data["keyId"]
+        API_PRIVATE_KEY_FILE["private_key"] = serialization.load_pem_private_key(
+            data["key"].encode(), password=None
         )
 
-        # Send introspection request
+    def introspection_request(self, token_string):
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {
             "client_assertion_type": "urn:ietf:params:oauth:client-assertion-type:jwt-bearer",
-            "client_assertion": jwt_token,
+            "client_assertion": client_assertion(),
             "token": token_string,
         }
+        return headers, data
+
+    def introspect_token(self, token_string):
+        headers, data = self.introspection_request(token_string)
         response = requests.post(ZITADEL_INTROSPECTION_URL, headers=headers, data=data)
         response.raise_for_status()
         token_data = response.json()
         return token_data
 
+    async def introspect_token_async(self, token_string):
+        headers, data = self.introspection_request(token_string)
+        response = await idp_client.post(
+            ZITADEL_INTROSPECTION_URL, headers=headers, data=data
+        )
+        response.raise_for_status()
+        token_data = response.json()
+        return token_data
+
+    async def authenticate_token_async(self, token_string):
+        token = token_cache.get(token_string)
+        if token is None:
+            token = await self.introspect_token_async(token_string)
+            token_cache.set(token_string, token)
+        return token
+
     def match_token_scopes(self, token, or_scopes):
         if or_scopes is None:
             return True
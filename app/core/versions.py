@@ -0,0 +1,19 @@
+from datetime import datetime
+
+
+def bump(inc: dict = None, fields: dict = None) -> dict:
+    """Update document that bumps a resource's version and updated_at,
+    optionally incrementing or setting other fields with it."""
+    return {
+        "$inc": {"version": 1, **(inc or {})},
+        "$set": {"updated_at": datetime.utcnow(), **(fields or {})},
+    }
+
+
+async def touch(document_model, query: dict, inc: dict = None):
+    """Bump the version of the documents matching query.
+
+    Call it after the change it reflects is written, so a reader never
+    caches old content under the new version.
+    """
+    await document_model.get_motor_collection().update_many(query, bump(inc))
@@ -1,16 +1,28 @@
-from beanie import init_beanie
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.core.authorization import auth_required
+from app.core.change_feed import change_feed
 from api.api_router import api_router
 from app.core.config import settings
-from app.core.db import db
+from app.core.db import init_db
+from app.core.http_client import idp_client
+from app.core.metrics import MetricsMiddleware
+from app.core.permissions import watch_role_changes
+from app.core.pictures import PICTURES_DIR
+from app.core.responses import TimedJSONResponse
+from app.core.shutdown import install_exit_signal_hook, on_exit_signal
+from app.core.thumbnails import thumbnail_pool
+from app.core.validator import ZitadelIntrospectTokenValidator
 from app.models.warehouse import *
 from os import path as os_path, mkdir
+import asyncio
 
 
 def get_application():
-    _app = FastAPI(title=settings.PROJECT_NAME)
+    _app = FastAPI(
+        title=settings.PROJECT_NAME, default_response_class=TimedJSONResponse
+    )
 
     _app.add_middleware(
         CORSMiddleware,
@@ -18,29 +30,55 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing"],
     )
+    _app.add_middleware(MetricsMiddleware)
 
     return _app
 
 
 app = get_application()
 
-if not os_path.exists("static"):
-    mkdir("static")
+if not os_path.exists(PICTURES_DIR):
+    mkdir(PICTURES_DIR)
+
+# Event streams only end once the feed stops, and uvicorn waits for open
+# responses before running the shutdown event, so stop it on the signal.
+# Uvicorn binds its signal handler before the startup event, hence this runs
+# at import; it is skipped unless the feed (and so any stream) is enabled.
+if settings.CHANGE_FEED:
+    install_exit_signal_hook()
+    on_exit_signal(change_feed.stop)
 
 
 @app.on_event("startup")
 async def on_startup():
-    await init_beanie(
-        database=db,
-        document_models=[
-            Location,
-            PermissionRole,
-            Storage,
-            Container,
-            Item,
-        ],
-    )
+    await init_db()
+    if settings.TOKEN_VALIDATION_MODE == "introspection":
+        ZitadelIntrospectTokenValidator.load_api_private_key(
+            settings.API_PRIVATE_KEY_FILE
+        )
+    await idp_client.start()
+    thumbnail_pool.start()
+    if settings.PERMISSION_CHANGE_STREAM:
+        app.state.role_watcher = asyncio.create_task(watch_role_changes())
+    if settings.CHANGE_FEED:
+        change_feed.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    role_watcher = getattr(app.state, "role_watcher", None)
+    if role_watcher is not None:
+        role_watcher.cancel()
+    await change_feed.close()
+    await idp_client.close()
+    thumbnail_pool.close()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 app.include_router(api_router)
@@ -1,49 +1,150 @@
-from beanie import Document, Indexed, init_beanie, UnionDoc
-import pymongo
+from datetime import datetime
+from typing import Optional
+from beanie import Document, Insert, before_event
+from pydantic import BaseModel, model_validator
+from pymongo import ASCENDING, TEXT, IndexModel
 
 
-class Location(Document):
-    code: Indexed(str, index_type=pymongo.TEXT)
+def search_indexes():
+    return [
+        IndexModel(
+            [("name", TEXT), ("description", TEXT)],
+            weights={"name": 10, "description": 1},
+            name="name_description_text",
+        ),
+        IndexModel([("location_code", ASCENDING), ("name_key", ASCENDING)]),
+    ]
+
+
+class Searchable(BaseModel):
+    """Keeps name_key, a lowercased copy of name, for indexed prefix search."""
+
+    @model_validator(mode="after")
+    def set_name_key(self):
+        self.name_key = self.name.lower()
+        return self
+
+
+def sync_indexes():
+    return [
+        IndexModel(
+            [
+                ("location_code", ASCENDING),
+                ("updated_at", ASCENDING),
+                ("_id", ASCENDING),
+            ]
+        ),
+    ]
+
+
+class Timestamped(BaseModel):
+    """created_at/updated_at stamps, set on insert; writes that change a
+    document afterwards set updated_at themselves."""
+
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @before_event(Insert)
+    def set_timestamps(self):
+        now = datetime.utcnow()
+        self.created_at = self.created_at or now
+        self.updated_at = self.updated_at or now
+
+
+class Location(Document, Timestamped):
+    code: str
     name: str
     description: str = None
+    storage_count: int = 0
+    container_count: int = 0
+    item_count: int = 0
+    version: int = 0
 
     class Settings:
         name = "locations"
+        indexes = [
+            IndexModel([("code", ASCENDING)], unique=True),
+        ]
 
 
-class PermissionRole(Document):
-    user_id: Indexed(str, index_type=pymongo.TEXT)
+class PermissionRole(Document, Timestamped):
+    user_id: str
     location_code: str
     role: str
 
     class Settings:
         name = "roles"
+        indexes = [
+            IndexModel(
+                [("user_id", ASCENDING), ("location_code", ASCENDING)], unique=True
+            ),
+        ]
 
 
-class Storage(Document):
-    location_code: Indexed(str, index_type=pymongo.TEXT)
+class Storage(Document, Searchable, Timestamped):
+    location_code: str
     code: str
     name: str
     description: str = None
+    container_count: int = 0
+    item_count: int = 0
+    version: int = 0
+    name_key: Optional[str] = None
 
     class Settings:
         name = "storages"
+        indexes = [
+            IndexModel(
+                [("location_code", ASCENDING), ("code", ASCENDING)], unique=True
+            ),
+            IndexModel([("location_code", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("code", ASCENDING)]),
+            *search_indexes(),
+            *sync_indexes(),
+        ]
 
 
-class Container(Document):
-    storage_code: Indexed(str, index_type=pymongo.TEXT)
+class Container(Document, Searchable, Timestamped):
+    storage_code: str
     code: str
     name: str
     description: str = None
+    location_code: Optional[str] = None
+    item_count: int = 0
+    version: int = 0
+    name_key: Optional[str] = None
 
     class Settings:
         name = "containers"
+        indexes = [
+            IndexModel([("storage_code", ASCENDING), ("code", ASCENDING)]),
+            IndexModel([("storage_code", ASCENDING), ("_id", ASCENDING)]),
+            IndexModel([("code", ASCENDING)]),
+            *search_indexes(),
+            *sync_indexes(),
+        ]
+
+
+class Picture(BaseModel):
+    size: int
+    sha256: str
+    updated_at: datetime
 
 
-class Item(Document):
-    container_code: Indexed(str, index_type=pymongo.TEXT)
+class Item(Document, Searchable, Timestamped):
+    container_code: str
     name: str
     description: str = None
+    storage_code: Optional[str] = None
+    location_code: Optional[str] = None
+    quantity: int = 1
+    picture: Optional[Picture] = None
+    name_key: Optional[str] = None
 
     class Settings:
         name = "items"
+        indexes = [
+            IndexModel([("container_code", ASCENDING), ("_id", ASCENDING)]),
+            *search_indexes(),
+            *sync_indexes(),
+        ]
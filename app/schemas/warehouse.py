@@ -1,5 +1,8 @@
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
 from fastapi import UploadFile
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class NewLocation(BaseModel):
@@ -26,9 +29,124 @@ class NewItem(BaseModel):
     container_code: str
     name: str
     description: str
+    quantity: int = Field(1, ge=0)
+
+
+class ItemIds(BaseModel):
+    ids: List[str]
+
+
+# Keeps deltas well inside Mongo's and orjson's 64-bit integers.
+MAX_STOCK_DELTA = 2**31
+
+
+class StockAdjustment(BaseModel):
+    delta: int = Field(ge=-MAX_STOCK_DELTA, le=MAX_STOCK_DELTA)
+
+
+class StockAdjustmentRow(BaseModel):
+    id: str
+    delta: int = Field(ge=-MAX_STOCK_DELTA, le=MAX_STOCK_DELTA)
+
+
+class StockAdjustments(BaseModel):
+    adjustments: List[StockAdjustmentRow]
+
+
+class PictureSize(str, Enum):
+    original = "original"
+    medium = "medium"
+    thumb = "thumb"
 
 
 class NewRole(BaseModel):
     user_id: str
     location_code: str
     role: str
+
+
+# Response models. They document the responses; the hot read endpoints
+# return TimedJSONResponse directly, so they are not validated against them.
+# Listings honour ?fields=, hence the optional fields.
+
+
+class PictureInfo(BaseModel):
+    size: int
+    sha256: str
+    updated_at: datetime
+
+
+class ItemOut(BaseModel):
+    id: str
+    container_code: Optional[str] = None
+    storage_code: Optional[str] = None
+    location_code: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    quantity: Optional[int] = None
+    picture: Optional[PictureInfo] = None
+    has_picture: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ItemPage(BaseModel):
+    items: List[ItemOut]
+    next_cursor: Optional[str] = None
+
+
+class ItemBatch(BaseModel):
+    items: Dict[str, ItemOut]
+    errors: Dict[str, dict]
+
+
+class ContainerOut(BaseModel):
+    id: Optional[str] = None
+    code: Optional[str] = None
+    storage_code: Optional[str] = None
+    location_code: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    item_count: int = 0
+    version: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class StorageSummary(BaseModel):
+    code: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    container_count: int = 0
+    item_count: int = 0
+    version: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class StorageOut(StorageSummary):
+    id: str
+    location_code: str
+    containers: List[ContainerOut]
+    next_cursor: Optional[str] = None
+
+
+class LocationOut(BaseModel):
+    id: str
+    code: str
+    name: str
+    description: Optional[str] = None
+    storage_count: int = 0
+    container_count: int = 0
+    item_count: int = 0
+    version: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    storages: List[StorageSummary]
+    next_cursor: Optional[str] = None
+
+
+class ResolvedContainer(BaseModel):
+    container: dict
+    items: List[ItemOut]
+    next_cursor: Optional[str] = None
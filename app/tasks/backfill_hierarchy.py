@@ -0,0 +1,93 @@
+"""Backfill the denormalized location/storage codes on containers and items.
+
+Run once after deploying, while the API is up, and before
+app.tasks.reconcile_counters, which initialises the counters from these
+codes:
+
+    python -m app.tasks.backfill_hierarchy
+"""
+import asyncio
+from pymongo import UpdateMany, UpdateOne
+from app.core.db import init_db
+from app.models.warehouse import Container, Item, Storage
+
+
+BATCH_SIZE = 500
+
+
+async def _write(collection, batch) -> int:
+    if not batch:
+        return 0
+    return (await collection.bulk_write(batch, ordered=False)).modified_count
+
+
+async def backfill_containers() -> int:
+    containers = Container.get_motor_collection()
+    pipeline = [
+        {"$match": {"location_code": None}},
+        {
+            "$lookup": {
+                "from": Storage.get_motor_collection().name,
+                "localField": "storage_code",
+                "foreignField": "code",
+                "as": "storage",
+            }
+        },
+        {
+            "$project": {
+                "location_code": {"$arrayElemAt": ["$storage.location_code", 0]}
+            }
+        },
+    ]
+    updated = 0
+    batch = []
+    async for container in containers.aggregate(pipeline):
+        if not container.get("location_code"):
+            continue
+        batch.append(
+            UpdateOne(
+                {"_id": container["_id"]},
+                {"$set": {"location_code": container["location_code"]}},
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            updated += await _write(containers, batch)
+            batch = []
+    updated += await _write(containers, batch)
+    return updated
+
+
+async def backfill_items() -> int:
+    items = Item.get_motor_collection()
+    updated = 0
+    batch = []
+    async for container in Container.get_motor_collection().find(
+        {"location_code": {"$ne": None}},
+        {"code": 1, "storage_code": 1, "location_code": 1},
+    ):
+        batch.append(
+            UpdateMany(
+                {"container_code": container["code"], "location_code": None},
+                {
+                    "$set": {
+                        "storage_code": container["storage_code"],
+                        "location_code": container["location_code"],
+                    }
+                },
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            updated += await _write(items, batch)
+            batch = []
+    updated += await _write(items, batch)
+    return updated
+
+
+async def main():
+    await init_db()
+    print(f"Containers updated: {await backfill_containers()}")
+    print(f"Items updated: {await backfill_items()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
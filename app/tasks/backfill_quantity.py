@@ -0,0 +1,24 @@
+"""Set quantity to 1 on items written before stock quantities existed,
+when each document stood for a single unit.
+
+    python -m app.tasks.backfill_quantity
+"""
+import asyncio
+from app.core.db import init_db
+from app.models.warehouse import Item
+
+
+async def backfill() -> int:
+    result = await Item.get_motor_collection().update_many(
+        {"quantity": None}, {"$set": {"quantity": 1}}
+    )
+    return result.modified_count
+
+
+async def main():
+    await init_db()
+    print(f"Items updated: {await backfill()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+"""Fill name_key, the lowercased name used by prefix search, on documents
+written before it existed.
+
+    python -m app.tasks.backfill_search_keys
+"""
+import asyncio
+from app.core.db import init_db
+from app.models.warehouse import Container, Item, Storage
+
+
+async def backfill() -> dict:
+    updated = {}
+    for document_model in (Storage, Container, Item):
+        result = await document_model.get_motor_collection().update_many(
+            {"name_key": None}, [{"$set": {"name_key": {"$toLower": "$name"}}}]
+        )
+        updated[document_model.__name__] = result.modified_count
+    return updated
+
+
+async def main():
+    await init_db()
+    for name, count in (await backfill()).items():
+        print(f"{name} updated: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
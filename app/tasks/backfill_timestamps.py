@@ -0,0 +1,32 @@
+"""Fill created_at and updated_at on documents written before they
+existed, from the creation time embedded in their ObjectId.
+
+    python -m app.tasks.backfill_timestamps
+"""
+import asyncio
+from app.core.db import init_db
+from app.models.warehouse import Container, Item, Location, PermissionRole, Storage
+
+
+async def backfill() -> dict:
+    updated = {}
+    for document_model in (Location, PermissionRole, Storage, Container, Item):
+        collection = document_model.get_motor_collection()
+        created = await collection.update_many(
+            {"created_at": None}, [{"$set": {"created_at": {"$toDate": "$_id"}}}]
+        )
+        await collection.update_many(
+            {"updated_at": None}, [{"$set": {"updated_at": "$created_at"}}]
+        )
+        updated[document_model.__name__] = created.modified_count
+    return updated
+
+
+async def main():
+    await init_db()
+    for name, count in (await backfill()).items():
+        print(f"{name} updated: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
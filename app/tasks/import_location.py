@@ -0,0 +1,65 @@
+"""Import a location tree from an export file.
+
+Accepts the NDJSON export (?format=ndjson) or the nested JSON export:
+
+    python -m app.tasks.import_location export.ndjson --user-id <sub>
+
+If the import fails, re-run it with the printed --resume-from value.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from app.core.db import init_db
+from app.core.importer import (
+    ImportFailed,
+    LocationImporter,
+    flatten_tree,
+    prepare_location,
+    spool_records,
+    validate_spool,
+)
+
+
+def open_export(file_path: str):
+    if not file_path.endswith(".json"):
+        return open(file_path, "rb")
+    with open(file_path, "r") as f:
+        tree = json.load(f)
+    spool = tempfile.TemporaryFile()
+    for line in flatten_tree(tree):
+        spool.write(line.encode() + b"\n")
+    return spool
+
+
+async def main(args):
+    await init_db()
+    with open_export(args.file) as spool:
+        try:
+            validator = validate_spool(spool)
+            admin_user_id = await prepare_location(
+                validator.location_code, args.user_id
+            )
+            importer = LocationImporter(
+                batch_size=args.batch_size,
+                resume_from=args.resume_from,
+                admin_user_id=admin_user_id,
+            )
+            async for imported in importer.run(spool_records(spool)):
+                print(f"Imported {imported}/{validator.total} records")
+        except ImportFailed as e:
+            for error in e.errors:
+                print(error, file=sys.stderr)
+            if e.resume_from:
+                print(f"Resume with --resume-from {e.resume_from}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a location export")
+    parser.add_argument("file")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--resume-from", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
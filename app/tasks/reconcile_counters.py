@@ -0,0 +1,26 @@
+"""Recompute the storage, container and item counters of locations,
+storages and containers, and fix the documents that drifted.
+
+Also how counters are initialised on existing data. Run
+app.tasks.backfill_hierarchy first; this task refuses to run while
+containers or items still lack their location:
+
+    python -m app.tasks.reconcile_counters [LOCATION_CODE]
+"""
+import asyncio
+import sys
+from app.core.counters import BackfillRequired, reconcile
+from app.core.db import init_db
+
+
+async def main(location_code=None):
+    await init_db()
+    try:
+        fixed = await reconcile(location_code)
+    except BackfillRequired as e:
+        sys.exit(str(e))
+    print(f"Documents fixed: {fixed}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*sys.argv[1:2]))
@@ -0,0 +1,76 @@
+"""Sync Item.picture metadata with the files in the pictures directory.
+
+Items whose picture file exists get its size, hash and modification time;
+items whose file is gone get their metadata cleared.
+
+    python -m app.tasks.reconcile_pictures
+"""
+import asyncio
+import hashlib
+import os
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from app.core.db import init_db
+from app.core.pictures import PICTURES_DIR
+from app.models.warehouse import Item
+
+
+BATCH_SIZE = 500
+
+
+def scan_pictures() -> dict:
+    pictures = {}
+    for entry in os.scandir(PICTURES_DIR):
+        name, extension = os.path.splitext(entry.name)
+        if extension != ".jpg" or not entry.is_file():
+            continue
+        try:
+            item_id = ObjectId(name)
+        except InvalidId:
+            continue
+
+        sha256 = hashlib.sha256()
+        with open(entry.path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        stat = entry.stat()
+        pictures[item_id] = {
+            "size": stat.st_size,
+            "sha256": sha256.hexdigest(),
+            "updated_at": datetime.utcfromtimestamp(stat.st_mtime),
+        }
+    return pictures
+
+
+async def reconcile() -> int:
+    pictures = await asyncio.to_thread(scan_pictures)
+    items = Item.get_motor_collection()
+    updated = 0
+    batch = []
+
+    async for item in items.find({}, {"picture": 1}):
+        picture = pictures.get(item["_id"])
+        current = item.get("picture")
+        if picture is None and current is None:
+            continue
+        if picture and current and picture["sha256"] == current.get("sha256"):
+            continue
+        batch.append(UpdateOne({"_id": item["_id"]}, {"$set": {"picture": picture}}))
+        if len(batch) >= BATCH_SIZE:
+            updated += (await items.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+
+    if batch:
+        updated += (await items.bulk_write(batch, ordered=False)).modified_count
+    return updated
+
+
+async def main():
+    await init_db()
+    print(f"Items updated: {await reconcile()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,8 @@
+"""Benchmarks that drive the real routers against a seeded warehouse.
+
+    python -m bench.run --in-memory
+    python -m bench.run --mongo mongodb://localhost:27017 --save bench/baseline.json
+    python -m bench.run --mongo mongodb://localhost:27017 --baseline bench/baseline.json
+
+See python -m bench.run --help for the seed size and concurrency options.
+"""
@@ -0,0 +1,262 @@
+"""Drive the real routers at set concurrency levels and report throughput,
+p50/p99 latency and Mongo commands per request.
+
+Requests go through httpx's ASGITransport, so the app and the load
+generator share one event loop and no network sits between them. Zitadel
+introspection is answered by an httpx.MockTransport. With --in-memory the
+data lives in mongomock-motor, which does not emit pymongo command events,
+so queries per request are only reported against a real mongod.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from statistics import mean
+
+SCENARIOS = ["get_items", "get_item", "create_item", "export_location"]
+QUERIES = re.compile(r'desc="(\d+) queries"')
+USER_ID = "bench-user"
+API = "/api/private/warehouse"
+
+
+def configure_environment(args):
+    """Settings are read at import time, so fill them in before importing
+    the app. The client assertion is signed with a throwaway key."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({"keyId": "bench", "key": pem, "clientId": "bench"}, f)
+
+    os.environ.update(
+        PROJECT_NAME="warehouse-bench",
+        DATABASE_URL=args.mongo or "mongodb://localhost:27017",
+        ZITADEL_DOMAIN="https://idp.bench",
+        ZITADEL_INTROSPECTION_URL="https://idp.bench/oauth/v2/introspect",
+        ZITADEL_TOKEN_URL="https://idp.bench/oauth/v2/token",
+        API_BASE_URL="https://api.bench",
+        API_CLIENT_ID="bench",
+        API_PRIVATE_KEY_FILE=f.name,
+        TOKEN_VALIDATION_MODE="introspection",
+    )
+    return f.name
+
+
+def introspect(request):
+    import httpx
+
+    return httpx.Response(
+        200,
+        json={
+            "active": True,
+            "sub": USER_ID,
+            "exp": int(time.time()) + 3600,
+            "iat": int(time.time()),
+        },
+    )
+
+
+async def get_items(client, warehouse, rng):
+    location, storage, container = warehouse.container(rng)
+    return await client.get(
+        f"{API}/location/{location}/storage/{storage}/container/{container}/items"
+    )
+
+
+async def get_item(client, warehouse, rng):
+    return await client.get(f"{API}/item/{rng.choice(warehouse.item_ids)}")
+
+
+async def create_item(client, warehouse, rng):
+    _, _, container = warehouse.container(rng)
+    return await client.post(
+        f"{API}/item",
+        json={"container_code": container, "name": "Bench item", "description": ""},
+    )
+
+
+async def export_location(client, warehouse, rng):
+    return await client.get(f"{API}/location/{rng.choice(warehouse.locations)}/export")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(fraction * (len(values) - 1)))]
+
+
+async def run_scenario(client, scenario, warehouse, concurrency, requests, warmup):
+    latencies, queries, errors = [], [], 0
+    rng = random.Random(0)
+    for _ in range(warmup):
+        await scenario(client, warehouse, rng)
+
+    pending = iter(range(requests))
+
+    async def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        for _ in pending:
+            start = time.perf_counter()
+            response = await scenario(client, warehouse, rng)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            match = QUERIES.search(response.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        # mongomock emits no command events, so every request reports 0.
+        "queries_per_request": mean(queries) if queries and any(queries) else None,
+    }
+
+
+REPORT_COLUMNS = [
+    ("throughput", "{:9.1f} req/s"),
+    ("p50_ms", "p50 {:8.2f} ms"),
+    ("p99_ms", "p99 {:8.2f} ms"),
+    ("queries_per_request", "queries {:.1f}"),
+]
+
+
+def report(results, baseline):
+    """Print one line per scenario, with the change against the baseline."""
+    for key, result in results.items():
+        line = [f"{key:<24}"]
+        for name, template in REPORT_COLUMNS:
+            value = result[name]
+            if value is None:
+                line.append(template.split()[0] + " n/a")
+                continue
+            cell = template.format(value)
+            previous = baseline.get("results", {}).get(key, {}).get(name)
+            if previous:
+                cell += f" ({(value - previous) / previous * 100:+.1f}%)"
+            line.append(cell)
+        line.append(f"errors {result['errors']}")
+        print("  ".join(line))
+
+
+async def main(args):
+    key_file = configure_environment(args)
+
+    import httpx
+    import app.core.db as db_module
+    from app.core.db import init_db
+    from app.core.http_client import idp_client
+    from app.core.validator import ZitadelIntrospectTokenValidator
+    from app.main import app
+    from bench.seed import seed
+
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+
+        db_module.client = AsyncMongoMockClient()
+    db_module.db = db_module.client[args.database]
+    await db_module.client.drop_database(args.database)
+    await init_db()
+
+    ZitadelIntrospectTokenValidator.load_api_private_key(key_file)
+    await idp_client.start(transport=httpx.MockTransport(introspect))
+
+    started = time.perf_counter()
+    warehouse = await seed(
+        USER_ID, args.locations, args.storages, args.containers, args.items
+    )
+    print(
+        f"Seeded {args.locations}x{args.storages}x{args.containers}x{args.items} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url="http://bench",
+        headers={"Authorization": "Bearer bench-token"},
+        timeout=None,
+    ) as client:
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                requests = (
+                    args.export_requests if name == "export_location" else args.requests
+                )
+                results[f"{name}@{concurrency}"] = await run_scenario(
+                    client,
+                    globals()[name],
+                    warehouse,
+                    concurrency,
+                    requests,
+                    args.warmup,
+                )
+
+    await idp_client.close()
+    if not args.keep:
+        await db_module.client.drop_database(args.database)
+    os.remove(key_file)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"Saved {args.save}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Warehouse API benchmarks")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mongo", help="mongod URL, e.g. mongodb://localhost:27017")
+    target.add_argument(
+        "--in-memory", action="store_true", help="use mongomock-motor instead"
+    )
+    parser.add_argument(
+        "--database",
+        default="warehouse_bench",
+        help="database to seed; it is dropped before and after the run",
+    )
+    parser.add_argument("--keep", action="store_true", help="keep the seeded data")
+    parser.add_argument("--locations", type=int, default=2)
+    parser.add_argument("--storages", type=int, default=10)
+    parser.add_argument("--containers", type=int, default=10)
+    parser.add_argument("--items", type=int, default=50, help="items per container")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--export-requests", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--save", help="write the results JSON here")
+    args = parser.parse_args(argv)
+    if args.database == "warehouse":
+        parser.error("refusing to seed (and drop) the application database")
+    return args
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,146 @@
+"""Synthetic warehouse seeded straight into the collections."""
+
+import random
+import string
+from datetime import datetime
+from typing import List
+from bson import ObjectId
+from app.models.warehouse import Container, Item, Location, PermissionRole, Storage
+
+BATCH_SIZE = 10000
+
+
+def make_code(n: int) -> str:
+    """The n-th code matching validate_code: A-0 .. A-999, B-0 .. ZZZZ-999."""
+    letters, number = divmod(n, 1000)
+    prefix = ""
+    while True:
+        letters, letter = divmod(letters, 26)
+        prefix = string.ascii_uppercase[letter] + prefix
+        if letters == 0:
+            break
+        letters -= 1
+    return f"{prefix}-{number}"
+
+
+class Warehouse:
+    """Codes and a sample of item ids the scenarios pick their targets from."""
+
+    def __init__(self):
+        self.locations: List[str] = []
+        self.containers: List[tuple] = []
+        self.item_ids: List[str] = []
+
+    def container(self, rng: random.Random) -> tuple:
+        return rng.choice(self.containers)
+
+
+async def _insert(document_model, documents: list):
+    if documents:
+        await document_model.get_motor_collection().insert_many(
+            documents, ordered=False
+        )
+        documents.clear()
+
+
+async def seed(
+    user_id: str,
+    locations: int,
+    storages: int,
+    containers: int,
+    items: int,
+    sample_size: int = 10000,
+) -> Warehouse:
+    """Insert locations x storages x containers x items, with counters set
+    and the given user admin of every location."""
+    warehouse = Warehouse()
+    now = datetime.utcnow()
+    stamps = {"created_at": now, "updated_at": now, "version": 1}
+    rng = random.Random(0)
+    storage_n = container_n = seen_items = 0
+    item_batch = []
+
+    for location_index in range(locations):
+        location_code = make_code(location_index)
+        warehouse.locations.append(location_code)
+        await Location.get_motor_collection().insert_one(
+            {
+                "code": location_code,
+                "name": f"Location {location_index}",
+                "description": "Benchmark location",
+                "storage_count": storages,
+                "container_count": storages * containers,
+                "item_count": storages * containers * items,
+                **stamps,
+            }
+        )
+        await PermissionRole.get_motor_collection().insert_one(
+            {"user_id": user_id, "location_code": location_code, "role": "admin"}
+        )
+
+        storage_batch, container_batch = [], []
+        for storage_index in range(storages):
+            storage_code = make_code(storage_n)
+            storage_n += 1
+            storage_batch.append(
+                {
+                    "location_code": location_code,
+                    "code": storage_code,
+                    "name": f"Storage {storage_index}",
+                    "name_key": f"storage {storage_index}",
+                    "description": "Benchmark storage",
+                    "container_count": containers,
+                    "item_count": containers * items,
+                    **stamps,
+                }
+            )
+            for container_index in range(containers):
+                container_code = make_code(container_n)
+                container_n += 1
+                warehouse.containers.append(
+                    (location_code, storage_code, container_code)
+                )
+                container_batch.append(
+                    {
+                        "location_code": location_code,
+                        "storage_code": storage_code,
+                        "code": container_code,
+                        "name": f"Container {container_index}",
+                        "name_key": f"container {container_index}",
+                        "description": "Benchmark container",
+                        "item_count": items,
+                        **stamps,
+                    }
+                )
+                for item_index in range(items):
+                    item_id = ObjectId()
+                    # Reservoir sample of ids for get_item.
+                    seen_items += 1
+                    if len(warehouse.item_ids) < sample_size:
+                        warehouse.item_ids.append(str(item_id))
+                    elif (slot := rng.randrange(seen_items)) < sample_size:
+                        warehouse.item_ids[slot] = str(item_id)
+                    item_batch.append(
+                        {
+                            "_id": item_id,
+                            "location_code": location_code,
+                            "storage_code": storage_code,
+                            "container_code": container_code,
+                            "name": f"Item {item_index}",
+                            "name_key": f"item {item_index}",
+                            "description": "Benchmark item",
+                            "quantity": 1,
+                            "picture": None,
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                    )
+                    if len(item_batch) >= BATCH_SIZE:
+                        await _insert(Item, item_batch)
+            if len(container_batch) >= BATCH_SIZE:
+                await _insert(Container, container_batch)
+        await _insert(Storage, storage_batch)
+        await _insert(Container, container_batch)
+
+    await _insert(Item, item_batch)
+    return warehouse
@@ -0,0 +1,15 @@
+import os
+
+# Settings are read when app.core.config is imported, so the tests provide
+# placeholder values for everything the app requires.
+for name, value in {
+    "PROJECT_NAME": "warehouse-test",
+    "DATABASE_URL": "mongodb://localhost:27017",
+    "ZITADEL_DOMAIN": "https://idp.test",
+    "ZITADEL_INTROSPECTION_URL": "https://idp.test/oauth/v2/introspect",
+    "ZITADEL_TOKEN_URL": "https://idp.test/oauth/v2/token",
+    "API_BASE_URL": "https://api.test",
+    "API_CLIENT_ID": "warehouse-test",
+    "API_PRIVATE_KEY_FILE": "/dev/null",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,151 @@
+import asyncio
+import sys
+import types
+import unittest
+from unittest import mock
+from app.core import shutdown
+from app.core.change_feed import CLOSED, OVERFLOW, ChangeFeed
+
+
+class ChangeFeedShutdownTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.watch_finished = asyncio.Event()
+
+        async def watch(feed):
+            try:
+                await asyncio.Event().wait()
+            finally:
+                # Cleanup that needs the loop, like closing a change stream.
+                await asyncio.sleep(0)
+                self.watch_finished.set()
+
+        patch = mock.patch.object(ChangeFeed, "_watch", watch)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.feed = ChangeFeed(queue_size=10)
+        self.feed.start()
+        await asyncio.sleep(0)
+
+    async def test_close_awaits_the_watch_task(self):
+        task = self.feed._task
+        await self.feed.close()
+        self.assertTrue(task.done())
+        self.assertTrue(self.watch_finished.is_set())
+        self.assertFalse(self.feed.running)
+
+    async def test_stop_ends_subscriptions(self):
+        subscription = self.feed.subscribe("user-1", "LOC-1")
+        subscription.queue.put_nowait({"type": "item"})
+
+        self.feed.stop()
+        self.assertFalse(self.feed.running)
+        self.assertEqual(await subscription.queue.get(), CLOSED)
+        self.assertTrue(subscription.queue.empty())
+        await self.feed.close()
+
+    async def test_subscribing_after_stop_is_closed_at_once(self):
+        self.feed.stop()
+        subscription = self.feed.subscribe("user-1", "LOC-1")
+        self.assertEqual(subscription.queue.get_nowait(), CLOSED)
+
+        self.feed.publish({"type": "item", "location_code": "LOC-1", "document": {}})
+        self.assertTrue(subscription.queue.empty())
+        await self.feed.close()
+
+
+def event(kind: str, location_code: str = "LOC-1", **document) -> dict:
+    return {
+        "op": "update",
+        "type": kind,
+        "location_code": location_code,
+        "document": document,
+    }
+
+
+class ChangeFeedFanOutTest(unittest.TestCase):
+    def setUp(self):
+        self.feed = ChangeFeed(queue_size=2)
+
+    def drain(self, subscription) -> list:
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    def test_location_subscription_gets_its_location_only(self):
+        subscription = self.feed.subscribe("user-1", "LOC-1")
+        storage = event("storage", code="ST-1")
+        self.feed.publish(storage)
+        self.feed.publish(event("storage", "LOC-2", code="ST-1"))
+        self.assertEqual(self.drain(subscription), [storage])
+
+    def test_container_subscription_matches_storage_and_code(self):
+        subscription = self.feed.subscribe("user-1", "LOC-1", ("ST-1", "CT-1"))
+        item = event("item", container_code="CT-1", storage_code="ST-1")
+        container = event("container", code="CT-1", storage_code="ST-1")
+        for published in [
+            item,
+            container,
+            event("item", container_code="CT-1", storage_code="ST-2"),
+            event("container", code="CT-1", storage_code="ST-2"),
+            event("item", container_code="CT-2", storage_code="ST-1"),
+            event("storage", code="ST-1"),
+        ]:
+            self.feed.publish(published)
+        self.assertEqual(self.drain(subscription), [item, container])
+
+    def test_slow_subscriber_is_dropped_with_overflow(self):
+        slow = self.feed.subscribe("user-1", "LOC-1")
+        fast = self.feed.subscribe("user-2", "LOC-1")
+        published = [event("item", name=str(number)) for number in range(3)]
+        for number, item in enumerate(published):
+            self.feed.publish(item)
+            if number < 2:
+                self.assertEqual(self.drain(fast), [item])
+
+        self.assertEqual(self.drain(slow), [OVERFLOW])
+        self.assertEqual(self.drain(fast), [published[2]])
+
+        self.feed.publish(event("item", name="after"))
+        self.assertTrue(slow.queue.empty())
+        self.assertEqual(len(self.drain(fast)), 1)
+
+
+class ExitSignalHookTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        class Server:
+            def handle_exit(server, sig, frame):
+                self.calls.append("server")
+
+        self.server_class = Server
+        module = types.ModuleType("uvicorn.server")
+        module.Server = Server
+        patches = [
+            mock.patch.dict(sys.modules, {"uvicorn.server": module}),
+            mock.patch.object(shutdown, "_callbacks", []),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_callbacks_run_before_the_server_exits(self):
+        shutdown.on_exit_signal(lambda: self.calls.append("callback"))
+        shutdown.install_exit_signal_hook()
+        shutdown.install_exit_signal_hook()
+
+        self.server_class().handle_exit(15, None)
+        self.assertEqual(self.calls, ["callback", "server"])
+
+    def test_failing_callback_does_not_block_exit(self):
+        shutdown.on_exit_signal(lambda: 1 / 0)
+        shutdown.install_exit_signal_hook()
+
+        with self.assertLogs("app.core.shutdown", "ERROR"):
+            self.server_class().handle_exit(15, None)
+        self.assertEqual(self.calls, ["server"])
+
+
+if __name__ == "__main__":
+    unittest.main()
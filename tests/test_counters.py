@@ -0,0 +1,30 @@
+import unittest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from app.core.counters import BackfillRequired, reconcile
+from app.core.db import document_models
+from app.models.warehouse import Container, Item
+
+
+class ReconcileBackfillTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        await init_beanie(
+            database=AsyncMongoMockClient()["warehouse"],
+            document_models=document_models,
+        )
+
+    async def test_legacy_container_is_refused(self):
+        await Container.get_motor_collection().insert_one(
+            {"code": "CT-1", "storage_code": "ST-1", "location_code": None}
+        )
+        with self.assertRaises(BackfillRequired):
+            await reconcile()
+
+    async def test_legacy_item_is_refused(self):
+        await Item.get_motor_collection().insert_one({"container_code": "CT-1"})
+        with self.assertRaises(BackfillRequired):
+            await reconcile("LOC-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from beanie import init_beanie
+from mongomock_motor import AsyncMongoMockClient
+from app.core.db import document_models
+from app.core.importer import ImportFailed, ImportValidator, item_storage
+
+
+def validate(records):
+    validator = ImportValidator()
+    for line_number, (kind, data) in enumerate(records, start=1):
+        validator.feed(line_number, kind, data)
+    validator.finish()
+    return validator
+
+
+HEADER = [
+    ("location", {"code": "LOC-1", "name": "Workshop"}),
+    ("storage", {"code": "ST-1", "location_code": "LOC-1", "name": "Left"}),
+    ("storage", {"code": "ST-2", "location_code": "LOC-1", "name": "Right"}),
+    ("container", {"code": "CT-1", "storage_code": "ST-1", "name": "Box"}),
+    ("container", {"code": "CT-1", "storage_code": "ST-2", "name": "Box"}),
+    ("container", {"code": "CT-2", "storage_code": "ST-2", "name": "Tray"}),
+]
+
+
+class ItemStorageTest(unittest.TestCase):
+    containers = {"CT-1": {"ST-1", "ST-2"}, "CT-2": {"ST-2"}}
+
+    def test_exported_storage_code_wins(self):
+        item = {"container_code": "CT-1", "storage_code": "ST-1"}
+        self.assertEqual(item_storage(item, self.containers), "ST-1")
+
+    def test_legacy_item_with_unique_container_code(self):
+        item = {"container_code": "CT-2"}
+        self.assertEqual(item_storage(item, self.containers), "ST-2")
+
+    def test_legacy_item_with_shared_container_code_is_rejected(self):
+        with self.assertRaises(ValueError):
+            item_storage({"container_code": "CT-1"}, self.containers)
+
+    def test_unknown_container_in_storage(self):
+        item = {"container_code": "CT-2", "storage_code": "ST-1"}
+        with self.assertRaises(ValueError):
+            item_storage(item, self.containers)
+
+
+class ImportValidatorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Records are checked with model_validate, which needs Beanie set up.
+        await init_beanie(
+            database=AsyncMongoMockClient()["warehouse"],
+            document_models=document_models,
+        )
+
+    def test_items_in_same_coded_containers(self):
+        items = [
+            {"container_code": "CT-1", "storage_code": storage, "name": "Bolt"}
+            for storage in ("ST-1", "ST-2")
+        ]
+        validator = validate(HEADER + [("item", item) for item in items])
+        self.assertEqual(validator.containers["CT-1"], {"ST-1", "ST-2"})
+
+    def test_ambiguous_legacy_item_fails_validation(self):
+        with self.assertRaises(ImportFailed) as raised:
+            validate(HEADER + [("item", {"container_code": "CT-1", "name": "a"})])
+        self.assertEqual(raised.exception.errors[0]["line"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
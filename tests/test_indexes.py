@@ -0,0 +1,84 @@
+import os
+import unittest
+import uuid
+from datetime import datetime
+import motor.motor_asyncio
+from beanie import init_beanie
+from app.core.db import document_models, explain, plan_stages
+from app.models.warehouse import Container, Item, Location, PermissionRole, Storage
+
+# explain() needs a real mongod; mongomock has no query planner.
+TEST_MONGODB_URL = os.environ.get("TEST_MONGODB_URL")
+
+
+class PlanStagesTest(unittest.TestCase):
+    def test_collects_nested_stages(self):
+        explain_result = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "FETCH",
+                    "inputStage": {"stage": "IXSCAN", "indexName": "code_1"},
+                },
+                "rejectedPlans": [{"stage": "COLLSCAN"}],
+            }
+        }
+        self.assertEqual(plan_stages(explain_result), ["FETCH", "IXSCAN"])
+
+
+@unittest.skipUnless(TEST_MONGODB_URL, "set TEST_MONGODB_URL to run explain checks")
+class HotQueryIndexTest(unittest.IsolatedAsyncioTestCase):
+    """The lookups the routers run on every request are served by an index,
+    and paged queries by one that also provides the sort order."""
+
+    async def asyncSetUp(self):
+        self.client = motor.motor_asyncio.AsyncIOMotorClient(TEST_MONGODB_URL)
+        self.database = self.client[f"warehouse_test_{uuid.uuid4().hex[:8]}"]
+        await init_beanie(
+            database=self.database,
+            document_models=document_models,
+            allow_index_dropping=True,
+        )
+
+    async def asyncTearDown(self):
+        await self.client.drop_database(self.database)
+        self.client.close()
+
+    async def assertIndexed(self, document_model, query, sort=None):
+        stages = plan_stages(await explain(document_model, query, sort))
+        self.assertIn("IXSCAN", stages)
+        self.assertNotIn("COLLSCAN", stages)
+        if sort:
+            self.assertNotIn("SORT", stages)
+
+    async def test_code_lookups(self):
+        await self.assertIndexed(Location, {"code": "LOC-1"})
+        await self.assertIndexed(Storage, {"location_code": "LOC-1", "code": "ST-1"})
+        await self.assertIndexed(Container, {"storage_code": "ST-1", "code": "CT-1"})
+        await self.assertIndexed(
+            PermissionRole, {"user_id": "user-1", "location_code": "LOC-1"}
+        )
+
+    async def test_child_pages(self):
+        by_id = [("_id", 1)]
+        await self.assertIndexed(Storage, {"location_code": "LOC-1"}, by_id)
+        await self.assertIndexed(Container, {"storage_code": "ST-1"}, by_id)
+        await self.assertIndexed(Item, {"container_code": "CT-1"}, by_id)
+
+    async def test_name_prefix_search(self):
+        for document_model in (Storage, Container, Item):
+            await self.assertIndexed(
+                document_model,
+                {"location_code": "LOC-1", "name_key": {"$regex": "^bolt"}},
+                [("name_key", 1)],
+            )
+
+    async def test_sync_feed(self):
+        query = {"location_code": "LOC-1", "updated_at": {"$lte": datetime.utcnow()}}
+        for document_model in (Storage, Container, Item):
+            await self.assertIndexed(
+                document_model, query, [("updated_at", 1), ("_id", 1)]
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import time
+import unittest
+from unittest import mock
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from app.core.config import settings
+from app.core.http_client import idp_client
+from app.core.jwks_validator import JWKSCache, ZitadelJWTTokenValidator
+from app.core.validator import ValidatorError
+
+AUDIENCE = "warehouse-api"
+
+
+def generate_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def public_jwk(key, kid: str) -> dict:
+    jwk = RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+    return {**jwk, "kid": kid, "alg": "RS256", "use": "sig"}
+
+
+def sign(key, kid: str, **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": settings.ZITADEL_DOMAIN,
+        "sub": "user-1",
+        "aud": AUDIENCE,
+        "iat": now,
+        "exp": now + 300,
+        "scope": "openid",
+        **claims,
+    }
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+class ZitadelJWTTokenValidatorTest(unittest.IsolatedAsyncioTestCase):
+    """Tokens are checked against a stub JWKS endpoint serving local keys."""
+
+    async def asyncSetUp(self):
+        self.key = generate_key()
+        self.jwks = {"keys": [public_jwk(self.key, "key-1")]}
+        self.jwks_requests = 0
+
+        def serve_jwks(request):
+            self.jwks_requests += 1
+            return httpx.Response(200, json=self.jwks)
+
+        await idp_client.close()
+        await idp_client.start(transport=httpx.MockTransport(serve_jwks))
+        self.addAsyncCleanup(idp_client.close)
+
+        patches = [
+            mock.patch(
+                "app.core.jwks_validator.jwks_cache",
+                JWKSCache("https://idp.test/oauth/v2/keys", min_refresh_interval=0),
+            ),
+            mock.patch.object(settings, "JWT_AUDIENCE", AUDIENCE),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.validator = ZitadelJWTTokenValidator()
+
+    async def authenticate(self, token: str) -> dict:
+        claims = await self.validator.authenticate_token_async(token)
+        self.validator.validate_token(claims, None, None)
+        return claims
+
+    async def test_valid_token(self):
+        claims = await self.authenticate(sign(self.key, "key-1"))
+        self.assertEqual(claims["sub"], "user-1")
+        self.assertTrue(claims["active"])
+        self.assertEqual(self.jwks_requests, 1)
+
+    async def test_expired_token(self):
+        token = sign(self.key, "key-1", exp=int(time.time()) - 10)
+        with self.assertRaises(ValidatorError) as raised:
+            await self.authenticate(token)
+        self.assertEqual(raised.exception.status_code, 401)
+        self.assertEqual(raised.exception.error["code"], "invalid_token_expired")
+
+    async def test_wrong_audience(self):
+        token = sign(self.key, "key-1", aud="another-api")
+        with self.assertRaises(ValidatorError) as raised:
+            await self.authenticate(token)
+        self.assertEqual(raised.exception.status_code, 401)
+        self.assertEqual(raised.exception.error["code"], "invalid_token")
+
+    async def test_bad_signature(self):
+        token = sign(generate_key(), "key-1")
+        with self.assertRaises(ValidatorError) as raised:
+            await self.authenticate(token)
+        self.assertEqual(raised.exception.error["code"], "invalid_token")
+
+    async def test_unknown_kid_refetches_keys(self):
+        await self.authenticate(sign(self.key, "key-1"))
+
+        rotated = generate_key()
+        self.jwks["keys"].append(public_jwk(rotated, "key-2"))
+        claims = await self.authenticate(sign(rotated, "key-2"))
+        self.assertEqual(claims["sub"], "user-1")
+        self.assertEqual(self.jwks_requests, 2)
+
+    async def test_unknown_kid_refetch_is_rate_limited(self):
+        from app.core import jwks_validator
+
+        jwks_validator.jwks_cache.min_refresh_interval = 60
+        await self.authenticate(sign(self.key, "key-1"))
+
+        for _ in range(3):
+            with self.assertRaises(ValidatorError) as raised:
+                await self.authenticate(sign(generate_key(), "key-9"))
+            self.assertEqual(raised.exception.error["code"], "invalid_token_key")
+        self.assertEqual(self.jwks_requests, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()